@@ -0,0 +1,100 @@
+import argparse, json, resource, statistics, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+import metrics
+from fake_server import FakeUnkoServer, make_fleet
+from fetcher import Fetcher, FetchError
+from number_logger import NumberLogger
+from targets import HEADERS, Target
+
+# === ロガーの負荷ベンチマーク ===
+# fake_server をスレッドで立て、NumberLogger を待ち時間なしで polls 回まわす。
+# 1秒あたりのポーリング数、段階ごとの所要時間（fetch / decode / match / write）、
+# 最大 RSS を車両数ごとに表示する。段階の時間は常駐モードと同じ metrics.Cycle で測るので、
+# write には CSV のほか roster・アーカイブの書き出しも入る。
+#
+#   python bench_logger.py --vehicles 20 200 --polls 100 --latency-ms 20
+
+JST = timezone(timedelta(hours=9))
+
+
+def _ms(values):
+    if not values:
+        return "-"
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return f"{statistics.mean(values) * 1000:7.2f} / {p95 * 1000:7.2f}"
+
+
+def run_bench(vehicles, polls, latency_ms=0, error_rate=0.0, start=None, step_sec=300):
+    start = start or datetime.now(JST).replace(hour=7, minute=0, second=0, microsecond=0)
+    server = FakeUnkoServer(make_fleet(vehicles, start=start, step_sec=step_sec),
+                            latency_ms, error_rate).start()
+    target = Target("bench", "chitetsu_train", "2235", data_root="data", csv_prefix="bench")
+    times = {s: [] for s in metrics.STAGES}
+    errors = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            logger = NumberLogger(target, start, csv_dir=tmp, live=False)
+            fetcher = Fetcher(server.url, target.payload, HEADERS,
+                              retry_budget_sec=5, backoff_sec=0.01)
+
+            def poll(now):
+                # 同じ応答でも毎回照合させたいので Fetcher.fetch（変化なしは None）は使わない
+                with metrics.timer("fetch"):
+                    body = fetcher.fetch_body()
+                with metrics.timer("decode"):
+                    trains = json.loads(body)
+                logger.handle(trains, now)
+
+            began = time.perf_counter()
+            for k in range(polls):
+                now = start + timedelta(seconds=step_sec * k)
+                cycle = metrics.Cycle(now)
+                try:
+                    metrics.context_for(cycle).run(poll, now)
+                except FetchError:
+                    errors += 1
+                    continue
+                for stage in metrics.STAGES:
+                    times[stage].append(cycle.stages.get(stage, 0.0))
+            elapsed = time.perf_counter() - began
+            logger.close()
+            fetcher.close()
+    finally:
+        server.stop()
+    return {
+        "vehicles": vehicles,
+        "polls": polls,
+        "errors": errors,
+        "polls_per_sec": polls / elapsed if elapsed else 0.0,
+        "times": times,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "server_requests": server.requests,
+    }
+
+
+def print_report(result):
+    print(f"--- 車両 {result['vehicles']} 台 × {result['polls']} 回 "
+          f"(失敗 {result['errors']}, リクエスト {result['server_requests']}) ---")
+    print(f"  {result['polls_per_sec']:.1f} polls/sec, 最大 RSS {result['max_rss_mb']:.1f} MB")
+    print("  段階      平均 ms /  p95 ms")
+    for stage in metrics.STAGES:
+        print(f"  {stage:<6} {_ms(result['times'][stage])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fake_server 相手にロガーの速さを測る")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--polls", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--step-sec", type=int, default=300)
+    args = parser.parse_args(argv)
+    for n in args.vehicles:
+        print_report(run_bench(n, args.polls, args.latency_ms, args.error_rate,
+                               step_sec=args.step_sec))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse, random, sys, tempfile, time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from records import PollFrame, infer_line_and_direction
+from timetable_cache import compile_season, load_compiled
+from timetable_index import NO_MATCH, TimetableIndex, find_train_number
+from timetable_loader import load_timetable, load_timetables, season_files
+from unyo import load_unyo_table
+
+# === 照合・読み込みのベンチマーク ===
+# data/2026・data/2025W の実ファイルと、列車を N 倍に増やした架空の時刻表で
+#   読み込み時間 / find_train_number 1回あたりの時間 / 1k・10k・100k 件の処理速度
+# を表示する。±900秒の窓まわりの正しさは tests/test_timetable_index.py で確かめる。
+#
+#   python bench_matching.py                 # 実ファイル + 10倍
+#   python bench_matching.py --scale 10 100  # 架空の時刻表の倍率
+
+SEASONS = ["2026", "2025W"]
+SIZES = [1_000, 10_000, 100_000]
+
+
+def _timed(fn, repeat=1):
+    # 最速の1回を秒で返す
+    best = None
+    result = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        took = time.perf_counter() - t
+        best = took if best is None else min(best, took)
+    return best, result
+
+
+# === 架空の時刻表（列車を scale 倍） ===
+def scaled_frame(frame, scale):
+    # 同じ列車を 1分ずつずらしながら scale 本ずつ複製する（列番は末尾に連番）
+    if scale <= 1:
+        return frame
+    base = frame.astype({c: str for c in ["line", "direction", "train_number", "station",
+                                          "source_file"]})
+    parts = []
+    for k in range(scale):
+        part = base.copy()
+        part["train_number"] = part["train_number"] + (f"-{k}" if k else "")
+        part["minutes"] = (part["minutes"].astype(int) + k) % 1440
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def observations(index, n, seed=0):
+    # 時刻表の (駅, 時刻) から ±20分ずらした観測を n 件作る
+    rng = random.Random(seed)
+    pool = []
+    for (line, dirn, station), (minutes, _, _) in index.items():
+        for m in minutes[:: max(1, len(minutes) // 50)]:
+            pool.append((station, m, line, dirn))
+    obs = []
+    for _ in range(n):
+        station, m, line, dirn = rng.choice(pool)
+        sec = (m * 60 + rng.randint(-1200, 1200)) % 86400
+        ts = datetime(2026, 4, 1, sec // 3600, sec % 3600 // 60, sec % 60)
+        delay = rng.choice((0, 0, 60, 180))
+        if rng.random() < 0.1:
+            line = dirn = None  # 系統・方向が取れない車両
+        obs.append((station, ts, delay, line, dirn))
+    return obs
+
+
+def bench_lookup(index, label):
+    print(f"--- {label}: {len(index)} 件の時刻 ---")
+    for n in SIZES:
+        obs = observations(index, n)
+
+        def run():
+            hits = 0
+            for station, ts, delay, line, dirn in obs:
+                if find_train_number(station, ts, delay, line, dirn, index)[0] != NO_MATCH:
+                    hits += 1
+            return hits
+        took, hits = _timed(run, repeat=3 if n < 100_000 else 1)
+        print(f"  {n:>7} 件: {took * 1000:8.1f} ms  {n / took:10.0f} 件/秒  "
+              f"{took / n * 1e6:6.2f} µs/件  合致 {hits / n:.1%}")
+
+        # 列車単位の照合の候補検索: 1件ずつの within と、まとめて引く within_batch
+        queries = [(station, (ts.hour * 3600 + ts.minute * 60 + ts.second - delay) % 86400,
+                    line, dirn) for station, ts, delay, line, dirn in obs]
+        repeat = 3 if n < 100_000 else 1
+        single, _ = _timed(lambda: [index.within(*q) for q in queries], repeat=repeat)
+        batch, _ = _timed(lambda: index.within_batch(queries), repeat=repeat)
+        print(f"  {'':>7}   within {single * 1000:8.1f} ms / within_batch {batch * 1000:8.1f} ms")
+
+
+def bench_load(season):
+    base = Path("data") / season
+    print(f"--- 読み込み: data/{season} ---")
+    files = [f for f in season_files(base, season, "weekday") if f[0].exists()]
+    if files:
+        took, _ = _timed(lambda: load_timetable(*files[0]), repeat=5)
+        print(f"  load_timetable（{files[0][0].name}）: {took * 1000:.1f} ms")
+    took, (frame, _) = _timed(lambda: load_timetables(files), repeat=3)
+    print(f"  load_timetables（平日 {len(files)} ファイル）: {took * 1000:.1f} ms")
+    took, _ = _timed(lambda: TimetableIndex.from_frame(frame), repeat=3)
+    print(f"  TimetableIndex.from_frame: {took * 1000:.1f} ms")
+    unyo = sorted(base.glob("*unyo.txt"))
+    if unyo:
+        took, _ = _timed(lambda: load_unyo_table(unyo[0]), repeat=5)
+        print(f"  load_unyo_table: {took * 1000:.2f} ms")
+    took, _ = _timed(lambda: compile_season(base, season))
+    print(f"  compile_season: {took * 1000:.1f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        load_compiled(base, season, cache_dir=Path(tmp))  # 書き出し
+        took, compiled = _timed(lambda: load_compiled(base, season, cache_dir=Path(tmp)),
+                                repeat=3)
+    print(f"  load_compiled（キャッシュあり）: {took * 1000:.1f} ms")
+    return frame, compiled.timetable("weekday")[0]
+
+
+def bench_infer(n=100_000):
+    keito = ["本線", "立山線", "不二越・上滝線", ""]
+    rosen = ["上り", "下り", ""]
+    rng = random.Random(0)
+    trains = [{"keito_name": rng.choice(keito), "rosen_name": rng.choice(rosen),
+               "keito_rosen_name": "", "vehicle_id": i, "teiryujo_name": "電鉄富山駅",
+               "headsign": "宇奈月温泉", "delay_sec": 60} for i in range(n)]
+    took, _ = _timed(lambda: [infer_line_and_direction(t) for t in trains], repeat=3)
+    print(f"--- infer_line_and_direction: {n} 件 {took * 1000:.1f} ms "
+          f"({took / n * 1e6:.2f} µs/件) ---")
+    took, _ = _timed(lambda: PollFrame.from_trains(trains), repeat=3)
+    print(f"--- PollFrame.from_trains: {n} 件 {took * 1000:.1f} ms "
+          f"({took / n * 1e6:.2f} µs/件) ---")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="時刻表の読み込みと列番照合の速さを測る")
+    parser.add_argument("--seasons", nargs="+", default=SEASONS)
+    parser.add_argument("--scale", type=int, nargs="+", default=[10],
+                        help="架空の時刻表で列車を何倍にするか")
+    args = parser.parse_args(argv)
+
+    bench_infer()
+    for season in args.seasons:
+        frame, index = bench_load(season)
+        bench_lookup(index, f"data/{season} 平日")
+        for scale in args.scale:
+            bigger = scaled_frame(frame, scale)
+            took, big = _timed(lambda: TimetableIndex.from_frame(bigger))
+            print(f"  ×{scale} の TimetableIndex.from_frame: {took * 1000:.1f} ms")
+            bench_lookup(big, f"data/{season} 平日 ×{scale}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import os, pickle
+from pathlib import Path
+
+# === チェックポイント ===
+# NumberLogger.snapshot() の結果を state/<対象名>.pkl に保存する。
+# 一時ファイル → rename で差し替えるので、書き込み中に落ちても前回分は残る。
+# 読めない・バージョンが違うファイルは無かったことにする（最初から照合し直すだけ）。
+
+STATE_DIR = Path("state")
+STATE_VERSION = 1
+
+
+class Checkpoint:
+    def __init__(self, root, name):
+        self.path = Path(root) / f"{name}.pkl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def save(self, state):
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((STATE_VERSION, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                version, state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError,
+                ImportError, ValueError, TypeError):
+            return None
+        if version != STATE_VERSION:
+            return None
+        return state
@@ -0,0 +1,74 @@
+import sys
+from importlib import import_module
+
+# === まとめてひとつの入口 ===
+# サブコマンドごとに必要なモジュールだけをその場で読む。
+# ライブのポーリング（log）はコンパイル済みキャッシュから時刻表を読むので pandas を読まない
+# （numpy も、1回のポーリングで照合し直す車両が多いときの within_batch でだけ読む）。
+# pandas を使うのはキャッシュを作り直すとき（build-cache / 古いキャッシュ）と bench matching だけ。
+#
+#   python cli.py log [--short | --daemon] [対象名 ...]
+#   python cli.py replay [--from 2026-04-01] [--to 2026-04-30] [--jobs 4]
+#   python cli.py build-cache [data/2026 ...]
+#   python cli.py roster [csv/ artifacts/*/ ...]
+#   python cli.py vehicles check / suggest [csv/ ...]
+#   python cli.py delay ingest [csv/ ...] / report [--by station hour] / trip <列番>
+#   python cli.py bench matching [--scale N ...] / python cli.py bench logger [...]
+#   python cli.py compact [parquet]
+#   python cli.py fake-server [...]
+
+LOG_MODES = {
+    None: "train_logger_with_number",      # 3時間分（cron 用）
+    "--short": "train_logger_with_number_50s",  # 50秒で終わる試験用
+    "--daemon": "daemon",                  # 止めるまで回し続ける
+}
+BENCHES = {"matching": "bench_matching", "logger": "bench_logger"}
+COMMANDS = {
+    "replay": "replay",
+    "build-cache": "timetable_cache",
+    "roster": "roster",
+    "delay": "delay_stats",
+    "vehicles": "vehicle_registry",
+    "fake-server": "fake_server",
+}
+
+USAGE = """使い方: python cli.py <コマンド> [引数 ...]
+  log [--short | --daemon] [対象名 ...]  ポーリングして CSV に記録
+  replay [...]                          アーカイブから CSV を作り直す
+  build-cache [data/<season> ...]       時刻表のコンパイル済みキャッシュを作る
+  roster [CSV かディレクトリ ...]        運用 × 編成 の一覧を作る（追記分だけ読む）
+  delay ingest|report|trip [...]        遅延・定時性の集計
+  vehicles check|suggest [...]          車両の登録簿の確認・未登録車両の編成の候補
+  bench matching|logger [...]           ベンチマーク
+  compact [parquet]                     Parquet の小さいファイルをまとめる
+  fake-server [...]                     unko_map_simple の代わりのローカルサーバー"""
+
+
+def _run(module, argv):
+    return import_module(module).main(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(USAGE)
+        return
+    command, rest = argv[0], argv[1:]
+    if command == "log":
+        mode = rest[0] if rest and rest[0] in LOG_MODES else None
+        if mode is not None:
+            rest = rest[1:]
+        return _run(LOG_MODES[mode], rest)
+    if command == "bench":
+        if not rest or rest[0] not in BENCHES:
+            raise SystemExit(f"bench の種類を指定してください（候補: {', '.join(BENCHES)}）")
+        return _run(BENCHES[rest[0]], rest[1:])
+    if command == "compact":
+        return _run("parquet_sink", argv)
+    if command in COMMANDS:
+        return _run(COMMANDS[command], rest)
+    raise SystemExit(f"不明なコマンド: {command}\n{USAGE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import csv, io, os
+from collections import deque
+from pathlib import Path
+
+# === ローテーション付き CSV 書き込み ===
+# ファイルは開いたままにしてバッチごとに flush する。日付が変わるか
+# max_bytes を超えたら新しいファイル（<prefix>_<日時>.csv）に切り替える。
+# 毎バッチ、末尾 latest_rows 行を <prefix>_latest.csv に
+# 一時ファイル → rename で書き出すので、ビューアが書きかけを読むことはない。
+
+
+class RotatingCsvWriter:
+    def __init__(self, prefix, header, csv_dir="csv", max_bytes=None, latest_rows=500):
+        self.prefix = prefix
+        self.header = header
+        self.csv_dir = Path(csv_dir)
+        self.max_bytes = max_bytes
+        self.latest_path = self.csv_dir / f"{prefix}_latest.csv"
+        self._tail = deque(maxlen=latest_rows) if latest_rows else None
+        self._file = None
+        self._writer = None
+        self._day = None
+        self.path = None
+        self.csv_dir.mkdir(parents=True, exist_ok=True)
+
+    def open(self, now):
+        # now の日時で新しいファイルを作る（BOM とヘッダーはここで1回だけ）
+        self.close()
+        stamp = now.strftime("%Y-%m-%d_%H-%M")
+        path = self.csv_dir / f"{self.prefix}_{stamp}.csv"
+        n = 1
+        while path.exists():
+            # 同じ分に2つ目のファイルができたとき（サイズでのローテーションなど）
+            n += 1
+            path = self.csv_dir / f"{self.prefix}_{stamp}_{n}.csv"
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.header)
+        self._file.flush()
+        self._day = now.date()
+
+    def _needs_rotation(self, now):
+        if self._file is None or now.date() != self._day:
+            return True
+        return self.max_bytes is not None and self._file.tell() >= self.max_bytes
+
+    def write_batch(self, rows, now):
+        if self._needs_rotation(now):
+            self.open(now)
+        self._writer.writerows(rows)
+        self._file.flush()
+        if self._tail is not None:
+            self._tail.extend(rows)
+            self.publish_latest()
+
+    def publish_latest(self):
+        buf = io.StringIO(newline="")
+        writer = csv.writer(buf)
+        writer.writerow(self.header)
+        writer.writerows(self._tail)
+        tmp = self.latest_path.with_name(self.latest_path.name + ".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, self.latest_path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+# === 追記分だけ読む ===
+def read_appended(path, offset=0):
+    # offset バイト目から読み、(行のリスト, 次の offset) を返す。
+    # 書きかけの最後の行（改行で終わっていないもの）は次回に回す。先頭から読むときはヘッダーを飛ばす
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return [], offset
+    text = data[:end].decode("utf-8-sig" if offset == 0 else "utf-8")
+    rows = list(csv.reader(io.StringIO(text, newline="")))
+    if offset == 0:
+        rows = rows[1:]
+    return rows, offset + end
@@ -0,0 +1,104 @@
+import signal, sys
+from datetime import datetime, timedelta, timezone
+
+from checkpoint import STATE_DIR, Checkpoint
+from feed import FeedServer, LiveFeed
+from fetcher import Fetcher, MultiFetcher
+from metrics import MetricsWriter
+from number_logger import CSV_HEADER, NumberLogger
+from poller import adaptive_interval, run_polling
+from targets import HEADERS, URL, select_targets
+
+# === 常駐モード ===
+# cron で3時間ずつ起動する代わりに、1つのプロセスでずっとポーリングし続ける。
+# 日付が変わったら終了せずに、その日の平日/休日ダイヤで NumberLogger を作り直す
+# （CSV も新しいファイルになる）。
+# 毎回の保存のあとに車両の状態・照合中の列車・運用の結びつきを state/<対象名>.pkl に書き、
+# 再起動したときは同じ日のものがあればそこから続ける。
+#
+#   python daemon.py [対象名 ...]
+#   （systemd などで動かす場合は SIGTERM で後始末してから終了する）
+
+JST = timezone(timedelta(hours=9))
+
+interval_minutes = 5
+parquet_dir = None  # "parquet" にすると parquet/ にも書く（pip install pyarrow が必要）
+archive_dir = "archive"  # 生データを残す（replay.py で再照合する用）。None で無効
+metrics_dir = "metrics"  # 1回ごとの段階別の時間・件数を metrics/poll_<日付>.jsonl に書く。None で無効
+prom_path = None  # "metrics/trainlog.prom" にすると Prometheus の textfile も書く
+feed_port = None  # 8000 にすると http://127.0.0.1:8000/ でビューアと差分 JSON（/api/state）を出す
+state_dir = STATE_DIR  # チェックポイントの置き場所
+
+
+class Daemon:
+    def __init__(self, targets, now, feed=None):
+        self.targets = targets
+        self.feed = feed  # 日付が変わってもビューアの seq が続くように、フィードは作り直さない
+        self.checkpoints = {t.name: Checkpoint(state_dir, t.name) for t in targets}
+        self.loggers = {}
+        self.day = None
+        self._open(now, resume=True)
+
+    def _open(self, now, resume=False):
+        # 駅間の所要時間の実績は前の日のものを引き継ぐ
+        segments = {name: logger.eta.segments for name, logger in self.loggers.items()}
+        self.close()
+        self.day = now.date()
+        for t in self.targets:
+            logger = NumberLogger(t, now, parquet_dir=parquet_dir, archive_dir=archive_dir,
+                                  feed=self.feed, segments=segments.get(t.name))
+            state = self.checkpoints[t.name].load() if resume else None
+            if state is not None and logger.restore(state):
+                print(f"[{now}] {t.name}: チェックポイントから再開します")
+            self.loggers[t.name] = logger
+
+    def handle(self, batch, now):
+        if now.date() != self.day:
+            # 日付が変わった → その日のダイヤを読み直し、車両の状態も持ち越さない
+            print(f"[{now}] 日付が変わったためダイヤを読み直します")
+            self._open(now)
+        for name, trains in batch.items():
+            logger = self.loggers[name]
+            logger.handle(trains, now)
+            self.checkpoints[name].save(logger.snapshot())
+
+    def close(self):
+        for logger in self.loggers.values():
+            logger.close()
+        self.loggers = {}
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    signal.signal(signal.SIGTERM, _terminate)
+    targets = select_targets(sys.argv[1:] if argv is None else argv)
+    feed = LiveFeed(CSV_HEADER, [t.name for t in targets]) if feed_port else None
+    daemon = Daemon(targets, datetime.now(JST), feed)
+    server = FeedServer(feed, port=feed_port).start() if feed else None
+
+    # 接続を使い回し、失敗時は次の周期までに再試行する
+    fetcher = MultiFetcher({
+        t.name: Fetcher(URL, t.payload, HEADERS, retry_budget_sec=interval_minutes * 60 / 4)
+        for t in targets
+    })
+    metrics = MetricsWriter(metrics_dir, "poll", prom_path) if metrics_dir else None
+
+    try:
+        # 止めるまで回し続ける（ラッシュ時は詰めて深夜は広げる）
+        run_polling(fetcher.fetch, daemon.handle, adaptive_interval(interval_minutes * 60),
+                    metrics=metrics)
+    except KeyboardInterrupt:
+        print("=== 終了が要求されました ===")
+    finally:
+        if server is not None:
+            server.stop()
+        fetcher.close()
+        daemon.close()
+        print("=== 保存完了 ===")
+
+
+if __name__ == "__main__":
+    main()
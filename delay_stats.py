@@ -0,0 +1,279 @@
+import argparse, json, re, sys, time
+from pathlib import Path
+
+import numpy as np
+
+from checkpoint import Checkpoint
+from csv_writer import read_appended
+from roster import log_files, log_key
+
+# === 遅延・定時性の集計 ===
+# ロガーの CSV（delay_sec・line・direction 列）から、(line, direction, 駅, 時) ごとの遅延のヒストグラムと
+# (line, direction, 列番, 駅) ごとの遅延の合計・件数を NumPy の配列で持つ。
+# どちらも足し算だけで更新できるので、CSV は追記分だけ読んで足していく（np.add.at）。
+# p50 / p90 / p99 はヒストグラムの累積和から求めるので、何週間分あっても全件を読み直さない。
+#
+#   python delay_stats.py ingest csv/ artifacts/*/      # 追記分を取り込む
+#   python delay_stats.py report --by station hour [--line honsen] [--direction up]
+#   python delay_stats.py trip 8304                     # 列車の駅ごとの遅延と増減
+
+STATS_DIR = Path("delay")
+BIN_SEC = 30                      # ヒストグラムの幅（秒）
+MIN_DELAY, MAX_DELAY = -300, 3600  # これより外は端のビンに入れる
+N_BINS = (MAX_DELAY - MIN_DELAY) // BIN_SEC + 1
+QUANTILES = (0.5, 0.9, 0.99)
+KEY_FIELDS = ("line", "direction", "station", "hour")
+TRIP_FIELDS = ("line", "direction", "train_number", "station")
+_TIMETABLE_FILE = re.compile(r"_(honsen|fuzikoshikamitaki|tateyama)_(up|down)_")
+
+
+def line_direction_of(row):
+    # ロガーが keito_name / rosen_name から判定した line・direction 列を使う（合致なしの行も入る）。
+    # その列がない古い行は timetable_file（"timetable2026_honsen_down_weekday.csv"）から。
+    # どちらからも分からなければ unknown
+    line = row[10] if len(row) > 11 else ""
+    direction = row[11] if len(row) > 11 else ""
+    if not (line and direction):
+        m = _TIMETABLE_FILE.search(row[5] or "")
+        if m:
+            line, direction = line or m.group(1), direction or m.group(2)
+    return line or "unknown", direction or "unknown"
+
+
+class _KeyTable:
+    # タプルのキー → 行番号。配列の行はキーが増えたら倍に伸ばす
+    def __init__(self, fields, keys=()):
+        self.fields = fields
+        self.keys = []
+        self.ids = {}
+        for key in keys:
+            self.id(tuple(key))
+
+    def id(self, key):
+        i = self.ids.get(key)
+        if i is None:
+            i = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+        return i
+
+    def ids_for(self, columns):
+        # 列ごとの配列から、行ごとのキー番号を返す（同じキーは np.unique でまとめて1回だけ引く）
+        packed = np.array(["\x1f".join(map(str, k)) for k in zip(*columns)])
+        uniq, inverse = np.unique(packed, return_inverse=True)
+        lookup = np.array([self.id(tuple(u.split("\x1f"))) for u in uniq], dtype=np.int64)
+        return lookup[inverse]
+
+    def column(self, field):
+        i = self.fields.index(field)
+        return np.array([k[i] for k in self.keys])
+
+
+def _grow(array, rows):
+    if rows <= len(array):
+        return array
+    out = np.zeros((max(rows, len(array) * 2),) + array.shape[1:], dtype=array.dtype)
+    out[:len(array)] = array
+    return out
+
+
+class DelayStats:
+    def __init__(self):
+        self.keys = _KeyTable(KEY_FIELDS)
+        self.hist = np.zeros((0, N_BINS), dtype=np.int64)
+        self.trips = _KeyTable(TRIP_FIELDS)
+        self.trip_delay = np.zeros(0, dtype=np.int64)    # 遅延の合計
+        self.trip_seconds = np.zeros(0, dtype=np.int64)  # 観測時刻（0時からの秒）の合計（駅の並び用）
+        self.trip_count = np.zeros(0, dtype=np.int64)
+
+    def add(self, line, direction, station, train_number, seconds, delay):
+        # 列ごとの配列で渡す（1回分でも数日分でもよい）
+        seconds = np.asarray(seconds, dtype=np.int64)
+        delay = np.asarray(delay, dtype=np.int64)
+        if len(delay) == 0:
+            return
+        hour = np.char.zfill((seconds // 3600 % 24).astype(str), 2)
+        ids = self.keys.ids_for((line, direction, station, hour))
+        self.hist = _grow(self.hist, len(self.keys.keys))
+        bins = (np.clip(delay, MIN_DELAY, MAX_DELAY) - MIN_DELAY) // BIN_SEC
+        np.add.at(self.hist, (ids, bins), 1)
+
+        matched = np.asarray(train_number) != "合致なし"
+        tids = self.trips.ids_for([np.asarray(c)[matched]
+                                   for c in (line, direction, train_number, station)])
+        n = len(self.trips.keys)
+        self.trip_delay = _grow(self.trip_delay, n)
+        self.trip_seconds = _grow(self.trip_seconds, n)
+        self.trip_count = _grow(self.trip_count, n)
+        np.add.at(self.trip_delay, tids, delay[matched])
+        np.add.at(self.trip_seconds, tids, seconds[matched])
+        np.add.at(self.trip_count, tids, 1)
+
+    def add_rows(self, rows):
+        # ロガーの CSV の行（number_logger.CSV_HEADER の並び。delay_sec 列のない古い行は飛ばす）
+        rows = [r for r in rows if len(r) >= 10 and r[9] != ""]
+        if not rows:
+            return 0
+        train_number, station, timestamp, delay = (
+            list(c) for c in zip(*((r[3], r[4], r[6], r[9]) for r in rows))
+        )
+        line, direction = zip(*map(line_direction_of, rows))
+        seconds = [int(t[11:13]) * 3600 + int(t[14:16]) * 60 for t in timestamp]
+        self.add(np.array(line), np.array(direction), np.array(station),
+                 np.array(train_number), seconds, [int(d) for d in delay])
+        return len(rows)
+
+    # === 問い合わせ ===
+    def _select(self, **where):
+        mask = np.ones(len(self.keys.keys), dtype=bool)
+        for field, value in where.items():
+            if value is None:
+                continue
+            if field == "hour":
+                value = str(int(value)).zfill(2)  # 保存は "07"。--hour 7 でも 07 でも同じ
+            mask &= self.keys.column(field) == str(value)
+        return mask
+
+    def report(self, by=("station",), quantiles=QUANTILES, **where):
+        # by の組み合わせごとに [*キー, 件数, 平均, p50, p90, p99]（遅延は秒）
+        n = len(self.keys.keys)
+        if n == 0:
+            return []
+        hist = self.hist[:n]
+        mask = self._select(**where)
+        groups = _KeyTable(tuple(by))
+        gids = groups.ids_for([self.keys.column(f)[mask] for f in by])
+        agg = np.zeros((len(groups.keys), N_BINS), dtype=np.int64)
+        np.add.at(agg, gids, hist[mask])
+        counts = agg.sum(axis=1)
+        # ビンの下端（30秒単位に切り捨てた遅延）で平均する。API の遅延秒はほぼ 30秒の倍数なので
+        # 下端がそのままの値になる（中央にすると定時の列車が +15秒に見える）
+        lower = MIN_DELAY + np.arange(N_BINS) * BIN_SEC
+        means = agg @ lower / np.maximum(counts, 1)
+        qs = _quantiles(agg, counts, quantiles)
+        out = []
+        for i in sorted(range(len(groups.keys)), key=groups.keys.__getitem__):
+            out.append(list(groups.keys[i]) + [int(counts[i]), round(float(means[i]), 1)]
+                       + [int(q) for q in qs[i]])
+        return out
+
+    def propagation(self, train_number, line=None, direction=None):
+        # 列車の駅ごとの平均遅延と、前の駅からの増減（駅は平均の観測時刻の順）
+        if not self.trips.keys:
+            return []
+        mask = self.trips.column("train_number") == str(train_number)
+        for field, value in (("line", line), ("direction", direction)):
+            if value is not None:
+                mask &= self.trips.column(field) == value
+        idx = np.flatnonzero(mask)
+        count = self.trip_count[idx]
+        mean_delay = self.trip_delay[idx] / count
+        order = np.argsort(self.trip_seconds[idx] / count, kind="stable")
+        out = []
+        prev = None
+        for i in order:
+            key = self.trips.keys[idx[i]]
+            d = float(mean_delay[i])
+            out.append([key[0], key[1], key[3], int(count[i]), round(d, 1),
+                        None if prev is None else round(d - prev, 1)])
+            prev = d
+        return out
+
+    # === 保存 ===
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        n, m = len(self.keys.keys), len(self.trips.keys)
+        np.savez_compressed(
+            tmp, keys=json.dumps(self.keys.keys, ensure_ascii=False), hist=self.hist[:n],
+            trips=json.dumps(self.trips.keys, ensure_ascii=False),
+            trip_delay=self.trip_delay[:m], trip_seconds=self.trip_seconds[:m],
+            trip_count=self.trip_count[:m],
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        stats = cls()
+        if not Path(path).exists():
+            return stats
+        with np.load(path) as z:
+            stats.keys = _KeyTable(KEY_FIELDS, json.loads(str(z["keys"])))
+            stats.hist = z["hist"]
+            stats.trips = _KeyTable(TRIP_FIELDS, json.loads(str(z["trips"])))
+            stats.trip_delay = z["trip_delay"]
+            stats.trip_seconds = z["trip_seconds"]
+            stats.trip_count = z["trip_count"]
+        return stats
+
+
+def _quantiles(agg, counts, quantiles):
+    # 各行のヒストグラムから分位点（そのビンの下端の秒）を求める
+    cum = np.cumsum(agg, axis=1)
+    out = np.empty((len(agg), len(quantiles)), dtype=np.int64)
+    for j, q in enumerate(quantiles):
+        target = np.ceil(counts * q).clip(min=1)[:, None]
+        out[:, j] = MIN_DELAY + (cum >= target).argmax(axis=1) * BIN_SEC
+    return out
+
+
+def ingest(paths, stats_dir=STATS_DIR):
+    # 追記分だけ取り込む。artifact ごとに同じファイルがあっても、
+    # roster と同じく log_key（ファイル名）で位置を覚えるので二重に数えない
+    stats_path = Path(stats_dir) / "delay_stats.npz"
+    checkpoint = Checkpoint(stats_dir, "delay_state")
+    offsets = checkpoint.load() or {}
+    stats = DelayStats.load(stats_path)
+    total = 0
+    for path in log_files(paths):
+        key = log_key(path)
+        rows, offsets[key] = read_appended(path, offsets.get(key, 0))
+        added = stats.add_rows(rows)
+        if added:
+            print(f"{path}: {added} 行")
+            total += added
+    if total:
+        stats.save(stats_path)
+    checkpoint.save(offsets)
+    return stats
+
+
+def _print_table(header, rows):
+    print("\t".join(header))
+    for r in rows:
+        print("\t".join("" if v is None else str(v) for v in r))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="遅延・定時性の集計")
+    parser.add_argument("--dir", default=str(STATS_DIR), help="集計の保存先")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="ロガーの CSV の追記分を取り込む")
+    p.add_argument("paths", nargs="*", default=["csv"])
+    p = sub.add_parser("report", help="遅延の分布（p50/p90/p99）")
+    p.add_argument("--by", nargs="+", default=["station"], choices=KEY_FIELDS)
+    for f in KEY_FIELDS:
+        p.add_argument(f"--{f}")
+    p = sub.add_parser("trip", help="列車の駅ごとの遅延の増減")
+    p.add_argument("train_number")
+    p.add_argument("--line")
+    p.add_argument("--direction")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == "ingest":
+        ingest(args.paths, args.dir)
+        return
+    started = time.perf_counter()
+    stats = DelayStats.load(Path(args.dir) / "delay_stats.npz")
+    if args.command == "report":
+        where = {f: getattr(args, f) for f in KEY_FIELDS}
+        rows = stats.report(args.by, **where)
+        _print_table(list(args.by) + ["n", "mean", "p50", "p90", "p99"], rows)
+    else:
+        rows = stats.propagation(args.train_number, args.line, args.direction)
+        _print_table(["line", "direction", "station", "n", "mean", "change"], rows)
+    print(f"--- {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import threading
+
+# === 駅間の位置推定と到着予測 ===
+# 照合でロックした列車（Trip）の停車駅の並び・API の遅延秒・これまでに見た駅間の所要時間から、
+#   ・各停車駅への到着予測（秒）
+#   ・いまどの駅とどの駅の間の何割あたりにいるか
+# を出す。予測は車両ごとにキャッシュし、新しい観測が来たときだけ作り直す
+# （ポーリングの間に何度問い合わせても位置の内挿だけで済む）。
+#
+# 駅間の所要時間は「実績 / 時刻表」の比を (line, direction, 駅, 次の駅) ごとに
+# 指数移動平均で持つ。実績がない区間は時刻表どおり（比 1.0）。
+
+ALPHA = 0.2                  # 実績を混ぜる割合
+RATIO_RANGE = (0.5, 3.0)     # 1回の観測で出た比はこの範囲に丸める
+
+
+class SegmentTimes:
+    def __init__(self, ratios=None):
+        self.ratios = dict(ratios or {})  # (line, direction, 駅, 次の駅) → 実績 / 時刻表
+
+    def ratio(self, trip, j):
+        key = (trip.line, trip.direction, trip.stations[j], trip.stations[j + 1])
+        return self.ratios.get(key, 1.0)
+
+    def learn(self, trip, j, k, elapsed_sec):
+        # 停車駅 j で見てから k で見るまで elapsed_sec かかった → j〜k の各区間の比を更新
+        scheduled = (trip.minutes[k] - trip.minutes[j]) * 60
+        if k <= j or scheduled <= 0 or elapsed_sec <= 0:
+            return
+        lo, hi = RATIO_RANGE
+        observed = min(max(elapsed_sec / scheduled, lo), hi)
+        for i in range(j, k):
+            key = (trip.line, trip.direction, trip.stations[i], trip.stations[i + 1])
+            old = self.ratios.get(key, 1.0)
+            self.ratios[key] = old + ALPHA * (observed - old)
+
+    def snapshot(self):
+        return dict(self.ratios)
+
+
+class Prediction:
+    __slots__ = ("trip", "pos", "anchor", "arrivals")
+
+    def __init__(self, trip, pos, anchor, arrivals):
+        self.trip = trip
+        self.pos = pos            # 最後に見た停車駅の位置
+        self.anchor = anchor      # その駅にいた（はずの）時刻（0時からの秒）
+        self.arrivals = arrivals  # pos+1 以降の停車駅への到着予測（秒）
+
+
+class EtaEstimator:
+    def __init__(self, segments=None):
+        self.segments = segments or SegmentTimes()
+        self.last = {}         # vehicle_id → (Trip, 位置, 見た時刻)（区間の学習用）
+        self.predictions = {}  # vehicle_id → Prediction（観測が来るまで使い回す）
+        self._lock = threading.Lock()  # 保存スレッドで更新し、フィードのスレッドから読む
+
+    def observe(self, vid, trip, pos, seconds, delay_sec):
+        # 照合でロックしている列車とその位置を渡す。seconds は観測した時刻（0時からの秒）
+        with self._lock:
+            last = self.last.get(vid)
+            if last is not None and last[0] is trip and pos > last[1]:
+                self.segments.learn(trip, last[1], pos, seconds - last[2])
+            if last is None or last[0] is not trip or pos != last[1]:
+                self.last[vid] = (trip, pos, seconds)
+            self.predictions[vid] = self._predict(trip, pos, delay_sec)
+
+    def forget(self, vid):
+        with self._lock:
+            self.last.pop(vid, None)
+            self.predictions.pop(vid, None)
+
+    def retain(self, present):
+        # 今回の応答にいない車両（運用終了・入庫）の予測を消す（フィードの removed と同じ扱い）
+        with self._lock:
+            for vid in [v for v in self.last if v not in present]:
+                del self.last[vid]
+            for vid in [v for v in self.predictions if v not in present]:
+                del self.predictions[vid]
+
+    def _predict(self, trip, pos, delay_sec):
+        # 時刻表の時刻 + 遅延 を起点に、区間ごとの所要時間（実績の比をかけたもの）を足していく。
+        # 早着はしない（時刻表より前にはならない）とみなす
+        anchor = trip.minutes[pos] * 60 + delay_sec
+        t = anchor
+        arrivals = []
+        for j in range(pos, len(trip.minutes) - 1):
+            run = (trip.minutes[j + 1] - trip.minutes[j]) * 60 * self.segments.ratio(trip, j)
+            t = max(trip.minutes[j + 1] * 60, t + run)
+            arrivals.append(int(t))
+        return Prediction(trip, pos, anchor, arrivals)
+
+    def eta(self, vid):
+        # [(駅, 到着予測の秒), ...]（この先の停車駅）。ロックしていない車両は空
+        with self._lock:
+            p = self.predictions.get(vid)
+        if p is None:
+            return []
+        return list(zip(p.trip.stations[p.pos + 1:], p.arrivals))
+
+    def position(self, vid, seconds):
+        # seconds の時点の (前の駅, 次の駅, 割合 0〜1)。終点に着いていれば (終点, None, 0.0)
+        with self._lock:
+            p = self.predictions.get(vid)
+        return None if p is None else _position(p, seconds)
+
+    def snapshot(self, seconds):
+        # フィード用。vehicle_id → {列番, 位置, この先の到着予測}
+        with self._lock:
+            predictions = dict(self.predictions)
+        out = {}
+        for vid, p in predictions.items():
+            prev_station, next_station, frac = _position(p, seconds)
+            ahead = zip(p.trip.stations[p.pos + 1:], p.arrivals)
+            out[str(vid)] = {
+                "train_number": p.trip.train_number,
+                "from": prev_station, "to": next_station, "progress": round(frac, 2),
+                "eta": [[st, _clock(t)] for st, t in ahead],
+            }
+        return out
+
+
+def _position(p, seconds):
+    stations = p.trip.stations
+    prev_station, prev_time = stations[p.pos], p.anchor
+    for i, arrival in enumerate(p.arrivals):
+        if seconds < arrival:
+            span = arrival - prev_time
+            frac = (seconds - prev_time) / span if span > 0 else 0.0
+            return prev_station, stations[p.pos + 1 + i], min(max(frac, 0.0), 1.0)
+        prev_station, prev_time = stations[p.pos + 1 + i], arrival
+    return prev_station, None, 0.0
+
+
+def _clock(seconds):
+    seconds %= 86400
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
@@ -0,0 +1,164 @@
+import argparse, json, random, threading, time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from raw_archive import read_archive
+from season_registry import shared_registry
+from trip_matcher import build_trips
+
+# === unko_map_simple.ajax.php の代わりになるローカルサーバー ===
+# get_unko_list に対して、アーカイブした応答を順番に返すか、時刻表から作った
+# 架空の車両リストを返す。車両数・応答の遅延・エラー率を変えられる。
+#
+#   python fake_server.py --vehicles 200 --latency-ms 50 --error-rate 0.05 [--error-status 403]
+#   python fake_server.py --replay archive/chitetsu/raw_2026-05-12.jsonl.gz
+
+JST = timezone(timedelta(hours=9))
+KEITO = {"honsen": "本線", "tateyama": "立山線", "fuzikoshikamitaki": "不二越・上滝線"}
+ROSEN = {"up": "上り", "down": "下り"}
+
+
+class SyntheticFleet:
+    # 時刻表の列車に車両を割り当て、呼ばれるたびに step_sec だけ時計を進める
+    def __init__(self, vehicles, start, step_sec=300, seed=0):
+        index, _, _ = shared_registry().timetable_for(start.date())
+        trips = sorted(build_trips(index).values(),
+                       key=lambda t: (t.minutes[0], t.line, t.direction, t.train_number))
+        rng = random.Random(seed)
+        self.clock = start
+        self.step = timedelta(seconds=step_sec)
+        self.vehicles = []  # (vehicle_id, Trip, 遅延秒)
+        for i in range(vehicles):
+            self.vehicles.append((10000 + i, trips[i % len(trips)], rng.choice((0, 0, 60, 120, 300))))
+
+    def next(self):
+        now = self.clock
+        self.clock += self.step
+        sec = now.hour * 3600 + now.minute * 60 + now.second
+        trains = []
+        for vid, trip, delay in self.vehicles:
+            # 始発前・終着後は始発駅・終着駅に止まっている扱い
+            i = 0
+            for j, m in enumerate(trip.minutes):
+                if m * 60 + delay <= sec:
+                    i = j
+            trains.append({
+                "vehicle_id": vid,
+                "teiryujo_name": trip.stations[i] + "駅",
+                "keito_name": KEITO.get(trip.line, ""),
+                "rosen_name": ROSEN.get(trip.direction, ""),
+                "keito_rosen_name": "",
+                "delay_sec": delay,
+                "headsign": trip.stations[-1],
+            })
+        return trains
+
+
+class RecordedFleet:
+    # アーカイブの応答を先頭から順に返す（最後まで行ったら最初に戻る）
+    def __init__(self, path):
+        self.responses = [trains for _, trains in read_archive(path)]
+        self.pos = 0
+
+    def next(self):
+        trains = self.responses[self.pos % len(self.responses)]
+        self.pos += 1
+        return trains
+
+
+class FakeUnkoServer:
+    def __init__(self, fleet, latency_ms=0, error_rate=0.0, host="127.0.0.1", port=0, seed=0,
+                 error_status=503):
+        self.fleet = fleet
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status  # 失敗させるときの応答（503 は再試行、4xx はしない）
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/rt3/unko_map_simple.ajax.php"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive を効かせる
+            disable_nagle_algorithm = True  # ヘッダーと本文の間で 40ms 待たされないように
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.requests += 1
+                    fail = server.rng.random() < server.error_rate
+                    if fail:
+                        server.errors += 1
+                    elif form.get("command") != ["get_unko_list"]:
+                        body = b"[]"
+                    else:
+                        body = json.dumps(server.fleet.next(), ensure_ascii=False).encode("utf-8")
+                if fail:
+                    self.send_response(server.error_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_fleet(vehicles=20, replay=None, start=None, step_sec=300):
+    if replay:
+        return RecordedFleet(replay)
+    return SyntheticFleet(vehicles, start or datetime.now(JST), step_sec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="buscatch の代わりのローカルサーバー")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--vehicles", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503, help="失敗させるときの HTTP ステータス")
+    parser.add_argument("--step-sec", type=int, default=300, help="1回の応答で進める時刻（秒）")
+    parser.add_argument("--replay", help="アーカイブ（raw_*.jsonl.gz）を順に返す")
+    args = parser.parse_args(argv)
+
+    server = FakeUnkoServer(make_fleet(args.vehicles, args.replay, step_sec=args.step_sec),
+                            args.latency_ms, args.error_rate, port=args.port,
+                            error_status=args.error_status)
+    print(f"=== {server.url} で待ち受け中（Ctrl+C で終了） ===")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import json, threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# === ビューア向けの差分フィード ===
+# ロガーが毎回の保存のあとに変化のあった行を update() で渡し、ここでは
+# 対象ごとに「車両 → 最新の行」と通し番号（seq）を持つ。
+#   GET /api/state?target=chitetsu&since=<seq>  … since より後に変わった車両と消えた車両
+#                                                 （since なし・古すぎるときは全件）
+#   GET /api/events?target=chitetsu              … Server-Sent Events（変化があるたびに差分）
+#   GET /api/eta?target=chitetsu                 … 今の時刻での駅間の位置と到着予測（eta.py）
+#   GET /                                         … index.html
+# 応答には ETag（対象と seq）を付け、If-None-Match が同じなら 304 を返す。
+
+JST = timezone(timedelta(hours=9))
+TOMBSTONE_LIMIT = 1000  # 消えた車両をいくつまで覚えておくか（これより古い since は全件に）
+INDEX_HTML = Path(__file__).with_name("index.html")
+
+
+class TargetFeed:
+    def __init__(self, header, vehicle_col="vehicle_id"):
+        self.header = header
+        self.vehicle_pos = header.index(vehicle_col)
+        self.seq = 0
+        self.vehicles = {}  # vehicle_id（文字列）→ (seq, 行の dict)
+        self.removed = {}   # vehicle_id → 消えたときの seq（古い順）
+        self.floor = 0      # since がこれより小さいと差分を作れない
+        self.updated_at = None
+
+    def update(self, rows, present, now):
+        for row in rows:
+            self.seq += 1
+            vid = str(row[self.vehicle_pos])
+            self.vehicles[vid] = (self.seq, dict(zip(self.header, row)))
+            self.removed.pop(vid, None)
+        if present is not None:
+            # 今回の応答にいない車両（運用終了・入庫）は消す
+            for vid in [v for v in self.vehicles if v not in present]:
+                self.seq += 1
+                del self.vehicles[vid]
+                self.removed[vid] = self.seq
+        while len(self.removed) > TOMBSTONE_LIMIT:
+            vid = next(iter(self.removed))
+            self.floor = self.removed.pop(vid)
+        self.updated_at = now.isoformat()
+
+    def delta(self, since=None):
+        full = since is None or since < self.floor or since > self.seq
+        if full:
+            vehicles = [rec for _, rec in self.vehicles.values()]
+            removed = []
+        else:
+            vehicles = [rec for seq, rec in self.vehicles.values() if seq > since]
+            removed = [vid for vid, seq in self.removed.items() if seq > since]
+        return {"seq": self.seq, "full": full, "updated_at": self.updated_at,
+                "vehicles": vehicles, "removed": removed}
+
+
+class LiveFeed:
+    def __init__(self, header, names=()):
+        self.header = header
+        self.targets = {name: TargetFeed(header) for name in names}  # 対象名 → TargetFeed
+        self.estimators = {}  # 対象名 → eta.EtaEstimator
+        self.changed = threading.Condition()
+
+    def attach_eta(self, name, estimator):
+        # NumberLogger を作り直したとき（日付が変わったとき）は差し替える
+        with self.changed:
+            self.estimators[name] = estimator
+
+    def eta(self, name, now):
+        with self.changed:
+            estimator = self.estimators.get(name)
+        if estimator is None:
+            return {}
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        return estimator.snapshot(seconds)
+
+    def update(self, name, rows, present, now):
+        # NumberLogger.handle から呼ばれる（保存スレッド）
+        with self.changed:
+            feed = self.targets.get(name)
+            if feed is None:
+                feed = self.targets[name] = TargetFeed(self.header)
+            feed.update(rows, present, now)
+            self.changed.notify_all()
+
+    def delta(self, name, since=None):
+        with self.changed:
+            feed = self.targets.get(name)
+            return None if feed is None else feed.delta(since)
+
+    def seq(self, name):
+        with self.changed:
+            feed = self.targets.get(name)
+            return None if feed is None else feed.seq
+
+    def wait(self, name, since, timeout):
+        # name の seq が since より進むか timeout 秒たつまで待ち、差分を返す
+        with self.changed:
+            self.changed.wait_for(lambda: (self.seq(name) or 0) > since, timeout)
+            return self.delta(name, since)
+
+    def default_target(self):
+        with self.changed:
+            return next(iter(self.targets), None)
+
+
+def _encode(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FeedServer:
+    def __init__(self, feed, host="127.0.0.1", port=8000, heartbeat_sec=15):
+        self.feed = feed
+        self.heartbeat_sec = heartbeat_sec
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True  # SSE の接続が残っていても終了できるように
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path in ("/", "/index.html"):
+                    self._send_file(INDEX_HTML, "text/html; charset=utf-8")
+                    return
+                if url.path not in ("/api/state", "/api/events", "/api/eta"):
+                    self._send(404, b"", "text/plain")
+                    return
+                name = (query.get("target") or [None])[0] or server.feed.default_target()
+                if server.feed.seq(name) is None:
+                    self._send(404, _encode({"error": f"不明な対象: {name}"}), "application/json")
+                    return
+                try:
+                    since = int(query["since"][0]) if "since" in query else None
+                except ValueError:
+                    since = None
+                if url.path == "/api/state":
+                    self._state(name, since)
+                elif url.path == "/api/eta":
+                    now = datetime.now(JST)
+                    body = {"at": now.isoformat(timespec="seconds"),
+                            "vehicles": server.feed.eta(name, now)}
+                    self._send(200, _encode(body), "application/json; charset=utf-8",
+                               {"Cache-Control": "no-cache"})
+                else:
+                    self._events(name, since)
+
+            def _state(self, name, since):
+                delta = server.feed.delta(name, since)
+                etag = f'"{name}-{delta["seq"]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send(200, _encode(delta), "application/json; charset=utf-8",
+                           {"ETag": etag, "Cache-Control": "no-cache"})
+
+            def _events(self, name, since):
+                # Last-Event-ID があれば再接続時にそこから続ける
+                last_id = self.headers.get("Last-Event-ID")
+                if last_id and last_id.isdigit():
+                    since = int(last_id)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    delta = server.feed.delta(name, since)
+                    while True:
+                        if delta["full"] or delta["vehicles"] or delta["removed"]:
+                            self.wfile.write(b"id: %d\ndata: " % delta["seq"] + _encode(delta)
+                                             + b"\n\n")
+                        else:
+                            self.wfile.write(b": keep-alive\n\n")
+                        self.wfile.flush()
+                        delta = server.feed.wait(name, delta["seq"], server.heartbeat_sec)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send_file(self, path, content_type):
+                try:
+                    body = path.read_bytes()
+                except OSError:
+                    self._send(404, b"", "text/plain")
+                    return
+                self._send(200, body, content_type)
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,114 @@
+import hashlib, json, random, time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# === 取得レイヤー ===
+# requests.Session で接続を使い回し（keep-alive）、一時的なエラーは
+# 指数バックオフで retry_budget_sec 以内に再試行する。
+# 応答本文が前回と同じなら None を返して後段の処理を省く。
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    pass
+
+
+class Fetcher:
+    def __init__(self, url, data, headers, timeout=10, retry_budget_sec=60,
+                 backoff_sec=1.0, max_backoff_sec=30.0, pool_size=4, session=None):
+        self.url = url
+        self.data = data
+        self.headers = headers
+        self.timeout = timeout
+        self.retry_budget_sec = retry_budget_sec
+        self.backoff_sec = backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._last_hash = None
+        self.attempts = 0  # 直近の fetch で投げたリクエスト数
+
+    def _post(self):
+        response = self.session.post(self.url, headers=self.headers, data=self.data,
+                                     timeout=self.timeout)
+        if response.status_code in RETRY_STATUS:
+            raise FetchError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.content
+
+    def fetch_body(self):
+        # 再試行込みで応答本文（bytes）を取る
+        deadline = time.monotonic() + self.retry_budget_sec
+        self.attempts = 0
+        while True:
+            self.attempts += 1
+            try:
+                body = self._post()
+                break
+            except requests.HTTPError:
+                metrics.inc("http_error")
+                raise  # 4xx は再試行しても変わらない
+            except (requests.RequestException, FetchError) as e:
+                metrics.inc("http_error")
+                wait = min(self.backoff_sec * 2 ** (self.attempts - 1), self.max_backoff_sec)
+                wait *= 1 + random.random() * 0.1
+                if time.monotonic() + wait >= deadline:
+                    raise FetchError(f"{self.attempts}回失敗: {e}") from e
+                time.sleep(wait)
+        return body
+
+    def fetch(self):
+        with metrics.timer("fetch"):
+            body = self.fetch_body()
+        digest = hashlib.sha1(body).digest()
+        if digest == self._last_hash:
+            return None
+        with metrics.timer("decode"):
+            trains = json.loads(body)
+        self._last_hash = digest  # JSON として読めたものだけ記録
+        return trains
+
+    def close(self):
+        self.session.close()
+
+
+# === 複数グループの同時取得 ===
+class MultiFetcher:
+    def __init__(self, fetchers, max_workers=None):
+        # fetchers: 対象名 → Fetcher
+        self.fetchers = fetchers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(fetchers))
+
+    def fetch(self):
+        # 全対象を同時に投げ、変化のあったものだけ 対象名 → 車両リスト で返す
+        # 計測中の Cycle をワーカースレッドにも引き継ぐ（Context は1スレッドずつなので毎回コピー）
+        futures = {name: self._pool.submit(copy_context().run, f.fetch)
+                   for name, f in self.fetchers.items()}
+        batch = {}
+        errors = []
+        for name, future in futures.items():
+            try:
+                trains = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                continue
+            if trains is not None:
+                batch[name] = trains
+        if errors and not batch:
+            raise FetchError(" / ".join(errors))
+        for e in errors:
+            print(f"エラー発生 ({e})")
+        return batch or None
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        for f in self.fetchers.values():
+            f.close()
@@ -0,0 +1,122 @@
+import json, os, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from pathlib import Path
+
+# === 計測（段階ごとの時間とカウンター） ===
+# ポーリング1回ごとに Cycle を作り、fetch / decode / match / write の所要時間と
+# 合致・合致なし・運用不明・スキップ・HTTP エラーなどの件数を集める。
+# Cycle は contextvars で渡すので、Fetcher や NumberLogger は
+# metrics.timer("match") / metrics.inc("skip") を呼ぶだけでよい（Cycle がなければ何もしない）。
+# 1回分を metrics/<prefix>_YYYY-MM-DD.jsonl に1行で追記し、prom_path を指定すれば
+# Prometheus の textfile（node_exporter の textfile collector 用）も毎回差し替える。
+
+STAGES = ("fetch", "decode", "match", "write")  # timer() に渡せる段階（jsonl・Prometheus の stage 名）
+PROM_PREFIX = "trainlog"
+
+_current = ContextVar("metrics_cycle", default=None)
+
+
+class Cycle:
+    def __init__(self, now, drift_sec=0.0):
+        self.now = now
+        self.drift_sec = drift_sec  # 予定時刻からの遅れ（秒）
+        self.stages = {}            # 段階 → 秒（複数対象なら合計）
+        self.counts = Counter()
+        self._lock = threading.Lock()  # MultiFetcher のスレッドからも書かれる
+
+    def add(self, stage, sec):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + sec
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def as_dict(self):
+        return {
+            "ts": self.now.isoformat(),
+            "drift_ms": round(self.drift_sec * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 2) for k, v in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+
+
+@contextmanager
+def timer(stage):
+    if stage not in STAGES:
+        raise ValueError(f"不明な段階: {stage}")
+    cycle = _current.get()
+    if cycle is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        cycle.add(stage, time.perf_counter() - start)
+
+
+def inc(name, n=1):
+    cycle = _current.get()
+    if cycle is not None:
+        cycle.inc(name, n)
+
+
+def context_for(cycle):
+    # cycle を現在の Cycle にした Context。run_in_executor(None, ctx.run, fn) で使う
+    ctx = copy_context()
+    ctx.run(_current.set, cycle)
+    return ctx
+
+
+class MetricsWriter:
+    def __init__(self, out_dir="metrics", prefix="poll", prom_path=None):
+        self.dir = Path(out_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.prom_path = Path(prom_path) if prom_path else None
+        self.cycles = 0
+        self.stage_totals = Counter()
+        self.count_totals = Counter()
+        self._lock = threading.Lock()
+
+    def emit(self, cycle):
+        line = json.dumps(cycle.as_dict(), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            path = self.dir / f"{self.prefix}_{cycle.now.date().isoformat()}.jsonl"
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.cycles += 1
+            self.stage_totals.update(cycle.stages)
+            self.count_totals.update(cycle.counts)
+            if self.prom_path is not None:
+                self._write_prom(cycle)
+
+    def _write_prom(self, cycle):
+        p = PROM_PREFIX
+        lines = [
+            f"# TYPE {p}_cycles_total counter",
+            f"{p}_cycles_total {self.cycles}",
+            f"# TYPE {p}_stage_seconds_total counter",
+        ]
+        lines += [f'{p}_stage_seconds_total{{stage="{s}"}} {v:.6f}'
+                  for s, v in sorted(self.stage_totals.items())]
+        lines.append(f"# TYPE {p}_last_stage_seconds gauge")
+        lines += [f'{p}_last_stage_seconds{{stage="{s}"}} {v:.6f}'
+                  for s, v in sorted(cycle.stages.items())]
+        lines.append(f"# TYPE {p}_events_total counter")
+        lines += [f'{p}_events_total{{kind="{k}"}} {v}'
+                  for k, v in sorted(self.count_totals.items())]
+        lines += [
+            f"# TYPE {p}_schedule_drift_seconds gauge",
+            f"{p}_schedule_drift_seconds {cycle.drift_sec:.3f}",
+            f"# TYPE {p}_last_poll_timestamp_seconds gauge",
+            f"{p}_last_poll_timestamp_seconds {cycle.now.timestamp():.0f}",
+        ]
+        # 読み取り側が書きかけを見ないように一時ファイルから差し替える
+        self.prom_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.prom_path.with_name(self.prom_path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.prom_path)
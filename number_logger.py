@@ -0,0 +1,230 @@
+import metrics
+from csv_writer import RotatingCsvWriter
+from eta import EtaEstimator, SegmentTimes
+from operation_chain import SWAP, OperationChain
+from parquet_sink import ParquetSink
+from raw_archive import RawArchive
+from records import PollFrame
+from roster import Roster
+from season_registry import day_suffix, shared_registry
+from timetable_index import NO_MATCH, TimetableIndex, seconds_of_day
+from trip_matcher import TripMatcher
+from vehicle_registry import unknown_label
+from vehicle_state import OPERATION_SWAP, VehicleTracker
+
+# === 列番・運用付きロガー（取得対象ごとに1つ） ===
+
+CSV_HEADER = [
+    "operation",       # 運用
+    "formation",       # 編成名
+    "headsign",        # 行先
+    "train_number",    # 列車番号
+    "station",
+    "timetable_file",
+    "timestamp",
+    "vehicle_id",
+    "event",           # new_trip / station_change / headsign_change / number_reassignment
+    "delay_sec",       # API の遅延秒（delay_stats.py で集計する）
+    "line",            # keito_name から判定した路線（合致なしでも入る）
+    "direction",       # rosen_name から判定した方向
+]
+
+
+class NumberLogger:
+    def __init__(self, target, started_at, csv_dir="csv", parquet_dir=None, archive_dir=None,
+                 live=True, feed=None, segments=None):
+        # live=False は replay 用（latest.csv の差し替えと標準出力への表示をしない）
+        # feed: feed.LiveFeed。渡すと毎回の変化をビューア向けの差分フィードにも流す
+        # segments: eta.SegmentTimes。日をまたいで駅間の所要時間の実績を引き継ぐとき
+        self.target = target
+        self.live = live
+        self.day = started_at.date()
+        self.suffix = day_suffix(self.day)
+        self.id_map = target.id_map_for(self.day)  # vehicle_id → 編成（その日に有効なもの）
+
+        # === 時刻表ファイル読み込み ===
+        # 日付に合うダイヤを選び、コンパイル済みキャッシュ（cache/timetable_<season>.pkl）から読む
+        if target.data_root is not None:
+            registry = shared_registry(target.data_root)
+            self.timetable_index, self.used_files, op_table = registry.timetable_for(
+                started_at.date(), target.season
+            )  # 平日 or 休日で切り替え
+        else:
+            self.timetable_index, self.used_files = TimetableIndex(), []
+            op_table = {}
+
+        # === 車両ごとの直前の状態と、列車単位の照合 ===
+        self.tracker = VehicleTracker()
+        self.matcher = TripMatcher(self.timetable_index)
+        self.chain = OperationChain(op_table, self.matcher.trips)
+        # ロック中の列車から駅間の位置と到着予測を出す（観測が来た車両だけ作り直す）
+        self.eta = EtaEstimator(segments)
+
+        # csv/<prefix>_<日時>.csv に追記し、csv/<prefix>_latest.csv を毎回差し替える
+        self.writer = RotatingCsvWriter(target.csv_prefix, CSV_HEADER, csv_dir=csv_dir,
+                                        latest_rows=500 if live else 0)
+        self.writer.open(started_at)
+        # parquet_dir を指定したときだけ Parquet にも書く（pyarrow が必要）
+        self.sink = ParquetSink(parquet_dir, target.csv_prefix) if parquet_dir else None
+        # その日の 運用 × 編成 を csv/<prefix>_roster_<日付>.csv に毎回差し替えて書く
+        self.roster = Roster(self.day.isoformat())
+        self.roster_path = self.writer.csv_dir / f"{target.csv_prefix}_roster_{self.roster.day}.csv"
+        # archive_dir を指定すると取得した生データも残す（replay.py で作り直せる）
+        self.archive = RawArchive(archive_dir, target.name) if archive_dir else None
+        self.feed = feed
+        if feed is not None:
+            feed.attach_eta(target.name, self.eta)
+
+    def handle(self, trains, now):
+        if self.archive is not None:
+            with metrics.timer("write"):
+                self.archive.append(trains, now)
+        with metrics.timer("match"):
+            frame = PollFrame.from_trains(trains)  # 応答を列ごとにするのは1回だけ
+            rows, records = self._match(frame, now)
+            self.eta.retain(set(frame.vehicle_id))
+        with metrics.timer("write"):
+            self.writer.write_batch(rows, now)
+            if self.sink is not None:
+                self.sink.write_batch(records, now)
+            if rows:
+                for row in rows:
+                    self.roster.add_row(row)
+                self.roster.write_csv(self.roster_path)
+        if self.feed is not None:
+            present = set(map(str, frame.vehicle_id))
+            self.feed.update(self.target.name, rows, present, now)
+        if self.live:
+            print(f"[{now}] {self.target.name}: データを保存しました "
+                  f"({len(rows)}件 / {len(trains)}台)")
+
+    def _match(self, frame, now):
+        id_map = self.id_map
+        timestamp = now.strftime("%Y-%m-%d %H:%M")  # 1回のポーリングで共通
+        day_seconds = seconds_of_day(now)
+        vids, stations, headsigns = frame.vehicle_id, frame.station, frame.headsign
+        lines, directions = frame.line, frame.direction
+
+        # === スキップ判定（照合の前に前回の状態と比べる） ===
+        changed = [i for i in range(len(frame))
+                   if self.tracker.changed(vids[i], stations[i], headsigns[i], lines[i],
+                                           directions[i])]
+        skipped = len(frame) - len(changed)
+        seconds = {i: (day_seconds - frame.delay_sec[i]) % 86400 for i in changed}
+
+        # === 時刻表の候補をまとめて引く ===
+        # ロック中の列車に沿っていない（か折り返した）車両だけ。照合の本体は運用の
+        # つながりを順に更新するので1台ずつだが、候補は観測だけで決まるので先に引いておける
+        lookup = [i for i in changed
+                  if self.tracker.is_new_trip(vids[i], lines[i], directions[i])
+                  or self.matcher.needs_lookup(vids[i], stations[i], seconds[i])]
+        candidates = dict(zip(lookup, self.matcher.lookup_batch(
+            [(stations[i], seconds[i], lines[i], directions[i]) for i in lookup])))
+
+        rows = []
+        records = []
+        no_match = unknown = 0
+        for i in changed:
+            vid, station, headsign = vids[i], stations[i], headsigns[i]
+            line, dirn = lines[i], directions[i]
+            formation = id_map.get(str(vid)) or unknown_label(vid)
+            delay_sec = frame.delay_sec[i]
+
+            if self.tracker.is_new_trip(vid, line, dirn):
+                self.matcher.reset(vid)
+                self.chain.advance(vid, seconds[i])
+            train_number, timetable_file = self.matcher.observe(
+                vid, station, seconds[i], line, dirn,
+                expected=self.chain.expected(vid, seconds[i]), candidates=candidates.get(i),
+            )
+            events = self.tracker.update(vid, station, headsign, line, dirn,
+                                         train_number, timetable_file)
+            if self.chain.update(vid, train_number) == SWAP:
+                events.append(OPERATION_SWAP)
+            if not events:
+                # 合致なしのまま止まっている車両を照合し直しただけ（何も変わらなければ記録しない）
+                skipped += 1
+                continue
+            locked = self.matcher.locked.get(vid)
+            if locked is not None:
+                self.eta.observe(vid, locked[0], locked[1], day_seconds, delay_sec)
+            else:
+                self.eta.forget(vid)
+
+            operation = self.chain.operation_for(vid, train_number) or "不明"
+            if train_number == NO_MATCH:
+                no_match += 1
+            if operation == "不明":
+                unknown += 1
+
+            # === CSV書き込み（バッチ末尾でまとめて） ===
+            rows.append([
+                operation,#運用
+                formation,#編成名
+                headsign,#行先
+                train_number,#列車番号
+                station,
+                timetable_file or "未使用",
+                timestamp,
+                vid,
+                "+".join(events),
+                delay_sec,
+                line or "",
+                dirn or "",
+            ])
+
+            if self.sink is not None:
+                records.append({
+                    "vehicle_id": vid, "line": line, "direction": dirn,
+                    "operation": operation, "formation": formation, "headsign": headsign,
+                    "train_number": train_number, "station": station,
+                    "timetable_file": timetable_file, "event": "+".join(events),
+                    "delay_sec": delay_sec,
+                })
+
+        metrics.inc("vehicles", len(frame))
+        metrics.inc("skip", skipped)
+        metrics.inc("match_hit", len(rows) - no_match)
+        metrics.inc("no_match", no_match)
+        metrics.inc("unknown_operation", unknown)
+        return rows, records
+
+    def snapshot(self):
+        # 再起動したときに続きから照合できるよう、車両の状態・照合中の列車・運用の結びつきを返す
+        return {
+            "day": self.day,
+            "used_files": list(self.used_files),
+            "tracker": self.tracker.snapshot(),
+            "matcher": self.matcher.snapshot(),
+            "chain": self.chain.snapshot(),
+            "segments": self.eta.segments.snapshot(),
+            "roster": self.roster.state(),
+        }
+
+    def restore(self, snapshot):
+        # 同じ日・同じ時刻表セットのときだけ戻す。戻したら True
+        # （駅間の所要時間の実績は日付によらないので常に戻す。
+        #  その日の roster は時刻表によらないので、同じ日なら時刻表が変わっていても戻す。
+        #  roster CSV は毎回まるごと書き直すので、戻さないとそれまでの分が消える）
+        self.eta.segments = SegmentTimes(snapshot.get("segments"))
+        if snapshot.get("day") != self.day:
+            return False
+        if "roster" in snapshot:
+            self.roster = Roster.from_state(self.roster.day, snapshot["roster"])
+        if snapshot.get("used_files") != list(self.used_files):
+            return False
+        self.tracker.restore(snapshot["tracker"])
+        self.matcher.restore(snapshot["matcher"])
+        self.chain.restore(snapshot["chain"])
+        return True
+
+    def close(self):
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+def handle_batch(loggers, batch, now):
+    # batch: 対象名 → 車両リスト（同じ時刻に取得したもの）
+    for name, trains in batch.items():
+        loggers[name].handle(trains, now)
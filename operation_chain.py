@@ -0,0 +1,101 @@
+from timetable_index import MATCH_WINDOW_SEC, NO_MATCH
+
+# === 運用のつながり ===
+# 運用表の各運用を列番の並び（列車のチェーン）として持つ。
+# 車両を一度どれかの運用に結びつけたら、その先に走るはずの列番と時刻を予測し、
+# 予測どおりに走っている間は照合し直さない。差し替え・運休などで予測から外れたときだけ
+# 列車単位の照合に戻る。照合できなかった周でも結びついた運用を埋められる。
+
+BIND = "bind"        # 初めて運用に結びついた
+SWAP = "swap"        # 別の運用に移った（差し替え）
+
+
+class OperationChain:
+    def __init__(self, op_table, trips):
+        # op_table: 運用 → 列番の並び / trips: trip_matcher.build_trips の結果
+        self.chains = {op: list(nums) for op, nums in op_table.items()}
+        self.by_number = {}  # 列番 → [(運用, 並びの位置), ...]
+        for op, nums in self.chains.items():
+            for i, n in enumerate(nums):
+                self.by_number.setdefault(n, []).append((op, i))
+        self.trips = {}      # 列番 → Trip（時刻表にない回送などは入らない）
+        for trip in trips.values():
+            self.trips.setdefault(trip.train_number, trip)
+        self.bound = {}      # vehicle_id → (運用, 並びの位置)
+        self.holders = {}    # 運用 → vehicle_id
+
+    def operation(self, vid):
+        b = self.bound.get(vid)
+        return b[0] if b else None
+
+    def operation_for(self, vid, train_number):
+        # 運用表にある列番ならその運用、合致なしなら結びついている運用で埋める
+        if str(train_number) in self.by_number or train_number == NO_MATCH:
+            return self.operation(vid)
+        return None
+
+    def expected(self, vid, seconds, window=MATCH_WINDOW_SEC):
+        # 結びついた運用で、seconds の時点に走っているはずの列車（Trip）を返す
+        b = self.bound.get(vid)
+        if b is None:
+            return None
+        op, i = b
+        for n in self.chains[op][i:]:
+            trip = self.trips.get(n)
+            if trip is None:
+                continue
+            if seconds < trip.minutes[0] * 60 - window:
+                return trip  # 次の列車の発車前（折り返し待ち）
+            if seconds <= trip.minutes[-1] * 60 + window:
+                return trip
+        return None
+
+    def advance(self, vid, seconds):
+        # 折り返し（新しい列車）を見たとき、結びついた運用の位置を終着済みの列車の先へ進める
+        b = self.bound.get(vid)
+        if b is None:
+            return
+        op, i = b
+        chain = self.chains[op]
+        while i + 1 < len(chain):
+            trip = self.trips.get(chain[i])
+            if trip is not None and seconds <= trip.minutes[-1] * 60:
+                break
+            i += 1
+        self.bound[vid] = (op, i)
+
+    def update(self, vid, train_number):
+        # 照合した列番で結びつきを更新し、BIND / SWAP / None を返す
+        candidates = self.by_number.get(str(train_number))
+        if not candidates:
+            return None  # 合致なし・運用表にない列番なら今の結びつきを保つ
+        b = self.bound.get(vid)
+        if b is not None:
+            own = [(op, i) for op, i in candidates if op == b[0]]
+            if own:
+                # 予測どおり運用の先へ進んだか、誤照合が直って運用の手前に戻った。
+                # どちらも運用は変わらないので SWAP にはしない
+                ahead = [c for c in own if c[1] >= b[1]]
+                self.bound[vid] = ahead[0] if ahead else own[-1]
+                return None
+        # 同じ列番が複数の運用にあるときは build_reverse_map と同じく後ろを採る
+        op, i = candidates[-1]
+        other = self.holders.get(op)
+        if other is not None and other != vid:
+            self.bound.pop(other, None)  # 運用を別の編成が引き継いだ
+        if b is not None and self.holders.get(b[0]) == vid:
+            del self.holders[b[0]]
+        self.bound[vid] = (op, i)
+        self.holders[op] = vid
+        return BIND if b is None else SWAP
+
+    def snapshot(self):
+        return {"bound": dict(self.bound), "holders": dict(self.holders)}
+
+    def restore(self, snapshot):
+        # 運用表にない運用（ダイヤ改正で消えたもの）は捨てる
+        self.bound = {vid: (op, i) for vid, (op, i) in snapshot["bound"].items()
+                      if op in self.chains and i < len(self.chains[op])}
+        self.holders = {op: vid for op, vid in snapshot["holders"].items()
+                        if self.bound.get(vid, (None,))[0] == op}
+
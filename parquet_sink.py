@@ -0,0 +1,132 @@
+import sys, time
+from pathlib import Path
+
+pa = pq = None  # pyarrow は重いので Parquet を使うときに初めて読む（_require_pyarrow）
+
+# === Parquet 出力（任意） ===
+# 1回のポーリング分を parquet/<prefix>/date=YYYY-MM-DD/line=<line>/ 以下に書く。
+# 実行中はパーティションごとに ParquetWriter を開いたままにして row group を足していき、
+# 終了時に閉じる（1回の実行で1パーティション1ファイル）。
+# 小さいファイルがたまったら compact でまとめる。
+
+DICT_COLUMNS = ["operation", "formation", "headsign", "train_number", "station",
+                "timetable_file", "direction", "event"]
+
+
+def _require_pyarrow(what):
+    # Parquet 出力は任意（pip install pyarrow）
+    global pa, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(f"{what}には pyarrow が必要です（pip install pyarrow）") from None
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+def _schema():
+    fields = [
+        pa.field("timestamp", pa.timestamp("s", tz="Asia/Tokyo")),
+        pa.field("vehicle_id", pa.int64()),
+    ]
+    fields += [pa.field(c, pa.dictionary(pa.int32(), pa.string())) for c in DICT_COLUMNS]
+    fields.append(pa.field("delay_sec", pa.int32()))
+    return pa.schema(fields)
+
+
+def _to_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetSink:
+    def __init__(self, root, prefix):
+        _require_pyarrow("Parquet 出力")
+        self.root = Path(root) / prefix
+        self.schema = _schema()
+        self.run_id = time.strftime("%Y%m%d%H%M%S")
+        self._writers = {}  # (date, line) → ParquetWriter
+
+    def _writer(self, day, line):
+        key = (day, line)
+        if key not in self._writers:
+            part_dir = self.root / f"date={day}" / f"line={line}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            path = part_dir / f"part-{self.run_id}.parquet"
+            self._writers[key] = pq.ParquetWriter(path, self.schema, compression="zstd")
+        return self._writers[key]
+
+    def write_batch(self, records, now):
+        # records: dict のリスト（vehicle_id, line, direction, delay_sec と DICT_COLUMNS の列）
+        by_line = {}
+        for r in records:
+            by_line.setdefault(r.get("line") or "unknown", []).append(r)
+        day = now.strftime("%Y-%m-%d")
+        ts = now.replace(microsecond=0)
+        for line, rs in by_line.items():
+            columns = {
+                "timestamp": [ts] * len(rs),
+                "vehicle_id": [_to_int(r.get("vehicle_id")) for r in rs],
+            }
+            for c in DICT_COLUMNS:
+                columns[c] = [r.get(c) for r in rs]
+            arrays = [
+                pa.array(columns["timestamp"], type=self.schema.field("timestamp").type),
+                pa.array(columns["vehicle_id"], type=pa.int64()),
+            ]
+            arrays += [pa.array(columns[c], type=pa.string()).dictionary_encode()
+                       for c in DICT_COLUMNS]
+            arrays.append(pa.array([r.get("delay_sec") for r in rs], type=pa.int32()))
+            table = pa.Table.from_arrays(arrays, schema=self.schema)
+            self._writer(day, line).write_table(table)
+
+    def close(self):
+        for w in self._writers.values():
+            w.close()
+        self._writers = {}
+
+
+# === 小さいファイルをパーティションごとに1つにまとめる ===
+def compact(root, min_files=2):
+    _require_pyarrow("Parquet の圧縮")
+    merged = 0
+    for part_dir in sorted({p.parent for p in Path(root).rglob("part-*.parquet")}):
+        files = sorted(part_dir.glob("part-*.parquet"))
+        if len(files) < min_files:
+            continue
+        tables, done = [], []
+        for f in files:
+            try:
+                tables.append(pq.read_table(f))
+            except pa.ArrowInvalid:
+                continue  # 書き込み中（フッター未書き込み）のファイルは次回に回す
+            done.append(f)
+        if len(tables) < min_files:
+            continue
+        table = pa.concat_tables(tables, promote_options="default")
+        table = table.sort_by("timestamp")
+        out = part_dir / f"part-compacted-{time.strftime('%Y%m%d%H%M%S')}.parquet"
+        tmp = out.with_suffix(".tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        tmp.rename(out)
+        for f in done:
+            f.unlink()
+        merged += 1
+        print(f"{part_dir}: {len(done)} ファイル → 1 ({table.num_rows} 行)")
+    return merged
+
+
+def main(argv=None):
+    # python parquet_sink.py compact [parquet]
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["compact"]:
+        raise SystemExit("使い方: python parquet_sink.py compact [parquet ディレクトリ]")
+    compact(argv[1] if len(argv) > 1 else "parquet")
+
+
+if __name__ == "__main__":
+    main()
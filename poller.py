@@ -0,0 +1,110 @@
+import asyncio, time
+from datetime import datetime, timedelta, timezone
+
+from metrics import Cycle, context_for
+
+# === 非同期ポーラー ===
+# 取得（fetch）と保存（handle）をスレッドで動かし、前回分の保存中に次のリクエストを
+# 投げられるようにする。待ち時間は monotonic 時計で測り、壁時計のきりのいい時刻
+# （5分間隔なら :00, :05, ...）に発火させるので、処理時間が周期にたまっていかない。
+
+JST = timezone(timedelta(hours=9))
+
+RUSH_HOURS = ((7, 9), (17, 19))   # [開始, 終了) 時
+NIGHT_HOURS = ((22, 24), (0, 6))
+
+
+def _in_hours(hour, ranges):
+    return any(start <= hour < end for start, end in ranges)
+
+
+def adaptive_interval(base_sec, rush_factor=0.5, night_factor=2.0):
+    # ラッシュ時は間隔を詰め、深夜は広げる
+    def interval(now):
+        if _in_hours(now.hour, RUSH_HOURS):
+            return base_sec * rush_factor
+        if _in_hours(now.hour, NIGHT_HOURS):
+            return base_sec * night_factor
+        return base_sec
+    return interval
+
+
+def next_tick(now, interval_sec):
+    # now の次に来る「0時から interval_sec の倍数」の時刻までの秒数
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (now - midnight).total_seconds()
+    ticks = int(elapsed // interval_sec) + 1
+    return ticks * interval_sec - elapsed
+
+
+def _print_error(now, e):
+    print(f"[{now}] エラー発生: {e}")
+
+
+def _handle_and_emit(handle, trains, now, cycle, metrics):
+    try:
+        handle(trains, now)
+    finally:
+        if metrics is not None:
+            metrics.emit(cycle)
+
+
+async def _poll(fetch, handle, interval, max_runs, until, should_stop, on_error, tz, metrics):
+    loop = asyncio.get_running_loop()
+    pending = None  # 前回分の保存処理
+    runs = 0
+    scheduled = None  # 今回の予定時刻（drift の計算用）
+    try:
+        while max_runs is None or runs < max_runs:
+            now = datetime.now(tz)
+            if should_stop is not None and should_stop(now):
+                break
+            drift = (now - scheduled).total_seconds() if scheduled is not None else 0.0
+            cycle = Cycle(now, drift)
+            ctx = context_for(cycle)  # fetch と handle の中から metrics.timer / inc で書ける
+
+            # 前回の保存が終わっていなくても先にリクエストを投げる
+            try:
+                trains = await loop.run_in_executor(None, ctx.run, fetch)
+            except Exception as e:
+                cycle.inc("fetch_failed")
+                on_error(now, e)
+                trains = None
+            else:
+                if trains is None:
+                    # 応答が前回と同じ（Fetcher が None を返した）
+                    cycle.inc("unchanged_response")
+                    print(f"[{now}] 前回と同じ応答のためスキップ")
+            if trains is None:
+                if metrics is not None:
+                    metrics.emit(cycle)
+            else:
+                if pending is not None:
+                    await pending
+                pending = loop.run_in_executor(None, ctx.run, _handle_and_emit,
+                                               handle, trains, now, cycle, metrics)
+            runs += 1
+
+            if max_runs is not None and runs >= max_runs:
+                break
+            now = datetime.now(tz)
+            wait = next_tick(now, interval(now))
+            scheduled = now + timedelta(seconds=wait)
+            if until is not None and time.monotonic() + wait >= until:
+                break
+            await asyncio.sleep(wait)
+    finally:
+        if pending is not None:
+            await pending
+
+
+def run_polling(fetch, handle, interval_sec, max_runs=None, duration_sec=None,
+                should_stop=None, on_error=_print_error, tz=JST, metrics=None):
+    # fetch(): 車両リストを返す（例外ならエラー扱い、None なら前回から変化なし）
+    # handle(trains, now): 1回分の保存。呼び出し順は fetch の順に保たれる
+    # interval_sec: 秒数、または now → 秒数 を返す関数（adaptive_interval など）
+    # metrics: MetricsWriter。1回ごとに段階の時間・件数・予定時刻からの遅れを書く
+    interval = interval_sec if callable(interval_sec) else (lambda now: interval_sec)
+    until = time.monotonic() + duration_sec if duration_sec is not None else None
+    asyncio.run(_poll(fetch, handle, interval, max_runs, until, should_stop, on_error, tz,
+                      metrics))
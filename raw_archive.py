@@ -0,0 +1,37 @@
+import gzip, json
+from datetime import datetime
+from pathlib import Path
+
+# === 生データのアーカイブ ===
+# 取得した車両リストをそのまま archive/<対象名>/raw_YYYY-MM-DD.jsonl.gz に追記する。
+# 1回のポーリングが1行（gzip のメンバー1つ）なので、途中で落ちても前の行は読める。
+# 照合ロジックや id_map を直したあとで replay.py から過去の日を作り直すのに使う。
+
+
+class RawArchive:
+    def __init__(self, root, name):
+        self.dir = Path(root) / name
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, day):
+        return self.dir / f"raw_{day.isoformat()}.jsonl.gz"
+
+    def append(self, trains, now):
+        line = json.dumps({"ts": now.isoformat(), "trains": trains},
+                          ensure_ascii=False, separators=(",", ":"))
+        with gzip.open(self.path_for(now.date()), "ab") as f:
+            f.write(line.encode("utf-8") + b"\n")
+
+
+def read_archive(path):
+    # (datetime, 車両リスト) を古い順に返す。最後の行が壊れていたらそこで止める
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                yield datetime.fromisoformat(rec["ts"]), rec["trains"]
+        except (EOFError, OSError):
+            return
@@ -0,0 +1,132 @@
+import sys
+from array import array
+
+# === 小さいレコード型 ===
+# 時刻表の停車や車両の観測を dict のまま持つと、同じキー・同じ駅名や路線名の文字列が
+# 何万回も並ぶ。ここでは
+#   StringTable … 駅名・列番・ファイル名などを番号にする（番号 → 文字列は list で引く）
+#   PollFrame   … 1回分の応答を列ごとにしたもの（駅名などは sys.intern 済み。
+#                 照合はこれをまとめて処理する）
+# を用意する。
+
+
+class StringTable:
+    # 文字列 ↔ 番号。pickle には names だけ書き、読み込み時に逆引きを作り直す
+    __slots__ = ("names", "_ids")
+
+    def __init__(self, names=()):
+        self.names = []
+        self._ids = {}
+        for name in names:
+            self.id(name)
+
+    def id(self, name):
+        i = self._ids.get(name)
+        if i is None:
+            i = self._ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return i
+
+    def get(self, name):
+        # 登録されていなければ None（照合側で新しい番号を作らないように）
+        return self._ids.get(name)
+
+    def __getitem__(self, i):
+        return self.names[i]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        return self.names
+
+    def __setstate__(self, names):
+        self.names = []
+        self._ids = {}
+        for name in names:
+            self.id(name)
+
+
+# === 路線・方向判定 ===
+# keito_name / rosen_name の組み合わせは数種類しかないので、判定した結果を表に覚えておき
+# 2回目からは dict を1回引くだけにする（駅名の正規化も同じ）
+_LINE_DIRECTION = {}  # (keito_name, rosen_name + keito_rosen_name) → (line, direction)
+_STATIONS = {}        # teiryujo_name → 正規化した駅名
+
+
+def classify_line_direction(keito, rosen_info):
+    hit = _LINE_DIRECTION.get((keito, rosen_info))
+    if hit is not None:
+        return hit
+    name = keito.strip()
+    if "立山線" in name:
+        line = "tateyama"
+    elif "本線" in name:
+        line = "honsen"
+    elif "不二越・上滝線" in name:
+        line = "fuzikoshikamitaki"
+    else:
+        line = None
+    if "上り" in rosen_info:
+        direction = "up"
+    elif "下り" in rosen_info:
+        direction = "down"
+    else:
+        direction = None
+    hit = _LINE_DIRECTION[(keito, rosen_info)] = (line, direction)
+    return hit
+
+
+def infer_line_and_direction(train: dict):
+    return classify_line_direction(
+        train.get("keito_name", ""),
+        train.get("rosen_name", "") + train.get("keito_rosen_name", ""),
+    )
+
+
+def normalize_station(name):
+    # 「電鉄富山駅」→「電鉄富山」（時刻表の駅名にそろえる）
+    hit = _STATIONS.get(name)
+    if hit is None:
+        hit = sys.intern(str(name or "").replace("駅", "").strip())
+        if isinstance(name, str):
+            _STATIONS[name] = hit
+    return hit
+
+
+class PollFrame:
+    # 1回分の response.json()（車両のリスト）を列ごとの list / array にしたもの。
+    # ポーリングごとに1度だけ作り、照合の前段（変化の判定・候補の一括検索）と
+    # 照合の本体で同じ列を使い回す。i 行目 = 応答の i 台目
+    __slots__ = ("vehicle_id", "station", "headsign", "line", "direction", "delay_sec")
+
+    def __init__(self):
+        self.vehicle_id = []
+        self.station = []
+        self.headsign = []
+        self.line = []
+        self.direction = []
+        self.delay_sec = array("l")
+
+    @classmethod
+    def from_trains(cls, trains):
+        frame = cls()
+        stations = _STATIONS
+        classified = _LINE_DIRECTION
+        for train in trains:
+            get = train.get
+            frame.vehicle_id.append(get("vehicle_id"))
+            name = get("teiryujo_name")
+            station = stations.get(name)
+            frame.station.append(station if station is not None else normalize_station(name))
+            frame.headsign.append(sys.intern(get("headsign") or ""))
+            keito = get("keito_name", "")
+            rosen_info = get("rosen_name", "") + get("keito_rosen_name", "")
+            hit = classified.get((keito, rosen_info)) or classify_line_direction(keito, rosen_info)
+            frame.line.append(hit[0])
+            frame.direction.append(hit[1])
+            frame.delay_sec.append(int(get("delay_sec") or 0))
+        return frame
+
+    def __len__(self):
+        return len(self.vehicle_id)
@@ -0,0 +1,104 @@
+import argparse, os, shutil, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from number_logger import NumberLogger
+from raw_archive import read_archive
+from season_registry import shared_registry
+from targets import select_targets
+
+# === アーカイブの再照合（replay / backfill） ===
+# archive/<対象名>/raw_YYYY-MM-DD.jsonl.gz を、ライブと同じ照合・運用の処理に流して
+# <out>/ に CSV を作り直す。1日分は順番に（車両の状態を引き継ぐため）、
+# 日どうしはプロセスプールで並列に処理する。
+#
+#   python replay.py [--target chitetsu] [--from 2026-04-01] [--to 2026-04-30] [--jobs 4]
+
+
+def replay_day(target_name, path, out_dir):
+    # out_dir の下の一時ディレクトリに作ってから、その日の前回の出力と入れ替える
+    # （同じ --out で再実行しても _2.csv が並んで roster・delay で二重に数えられないように）
+    target = select_targets([target_name])[0]
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=out_dir, prefix=f".{path.name}."))
+    try:
+        logger = None
+        polls = 0
+        for now, trains in read_archive(path):
+            if logger is None:
+                logger = NumberLogger(target, now, csv_dir=staging, live=False)
+            logger.handle(trains, now)
+            polls += 1
+        if logger is not None:
+            logger.close()
+        for old in day_outputs(out_dir, target.csv_prefix, _archive_day(path)):
+            old.unlink()
+        for new in staging.iterdir():
+            os.replace(new, out_dir / new.name)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return path.name, polls
+
+
+def day_outputs(out_dir, prefix, day):
+    # その日の CSV（<prefix>_<日付>_<時刻>.csv）と roster（<prefix>_roster_<日付>.csv）
+    out_dir = Path(out_dir)
+    paths = list(out_dir.glob(f"{prefix}_{day.isoformat()}_*.csv"))
+    roster = out_dir / f"{prefix}_roster_{day.isoformat()}.csv"
+    return paths + ([roster] if roster.exists() else [])
+
+
+def _archive_day(path):
+    return date.fromisoformat(path.name[len("raw_"):-len(".jsonl.gz")])
+
+
+def prepare_caches(target_name, paths):
+    # 使うダイヤのキャッシュを親プロセスで1回だけ作り直しておく
+    # （ワーカーごとに作り直すと同じキャッシュを同時に書くことになる）
+    target = select_targets([target_name])[0]
+    if target.data_root is None:
+        return []
+    registry = shared_registry(target.data_root)
+    names = sorted({target.season or registry.season_for(_archive_day(p)).name for p in paths})
+    for name in names:
+        registry.compiled(name)
+    return names
+
+
+def archive_days(archive_dir, target_name, since=None, until=None):
+    paths = []
+    for path in sorted((Path(archive_dir) / target_name).glob("raw_*.jsonl.gz")):
+        day = _archive_day(path)
+        if (since is None or day >= since) and (until is None or day <= until):
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="アーカイブした生データから CSV を作り直す")
+    parser.add_argument("--target", default="chitetsu")
+    parser.add_argument("--archive", default="archive")
+    parser.add_argument("--out", default="replay")
+    parser.add_argument("--from", dest="since", type=date.fromisoformat)
+    parser.add_argument("--to", dest="until", type=date.fromisoformat)
+    parser.add_argument("--jobs", type=int, default=None, help="並列数（省略時は CPU 数）")
+    args = parser.parse_args(argv)
+
+    paths = archive_days(args.archive, args.target, args.since, args.until)
+    if not paths:
+        print("対象のアーカイブがありません")
+        return
+    started = time.perf_counter()
+    prepare_caches(args.target, paths)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(replay_day, args.target, p, args.out) for p in paths]
+        for future in futures:
+            name, polls = future.result()
+            print(f"{name}: {polls} 回分を再照合")
+    print(f"=== {len(paths)} 日分 完了 ({time.perf_counter() - started:.1f} 秒) ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse, csv, io, os, sys
+from collections import Counter
+from pathlib import Path
+
+from checkpoint import Checkpoint
+from csv_writer import read_appended
+from timetable_index import NO_MATCH
+
+# === 運用 × 編成の一覧（日ごと） ===
+# ロガーの行（CSV_HEADER の並び）を1行ずつ足していき、
+# (運用, 編成) ごとに 最初/最後に見た時刻・目撃数・列番が合った数 を持つ。
+# 確からしさ = その運用の目撃のうち、この編成だった割合。
+# 1行足すのは O(1) なので、ポーリングごとに変化のあった行だけ渡せばよい。
+#
+# CSV から作るときは、ファイルごとに読んだバイト位置を state に覚えておき、
+# 次回は追記された分だけ読む。位置はファイル名（train_log_<日時>.csv は実行ごとに一意）で
+# 覚えるので、7回分のジョブの artifact に同じファイルが何度入っていても1回しか数えない。
+#
+#   python roster.py csv/ artifacts/*/ [--out roster] [--state roster]
+
+UNKNOWN_OPERATION = "不明"
+ROSTER_HEADER = ["date", "operation", "formation", "vehicle_id", "first_seen", "last_seen",
+                 "sightings", "matched", "confidence"]
+
+
+class RosterEntry:
+    __slots__ = ("operation", "formation", "vehicle_id", "first_seen", "last_seen",
+                 "sightings", "matched")
+
+    def __init__(self, operation, formation, vehicle_id, timestamp):
+        self.operation = operation
+        self.formation = formation
+        self.vehicle_id = vehicle_id
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.sightings = 0
+        self.matched = 0  # 列番が合致した目撃（合致なしを運用で埋めたものは含まない）
+
+
+class Roster:
+    # 1日分の 運用 → 編成
+    def __init__(self, day):
+        self.day = day  # "YYYY-MM-DD"
+        self.entries = {}             # (運用, 編成) → RosterEntry
+        self.op_sightings = Counter()  # 運用 → 目撃数（確からしさの分母）
+
+    def add(self, operation, formation, vehicle_id, train_number, timestamp):
+        if not operation or operation == UNKNOWN_OPERATION:
+            return
+        key = (operation, formation)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = RosterEntry(operation, formation, vehicle_id, timestamp)
+        if timestamp < entry.first_seen:
+            entry.first_seen = timestamp
+        if timestamp > entry.last_seen:
+            entry.last_seen = timestamp
+        entry.sightings += 1
+        if train_number != NO_MATCH:
+            entry.matched += 1
+        self.op_sightings[operation] += 1
+
+    def add_row(self, row):
+        # row: number_logger.CSV_HEADER の並び
+        operation, formation, _, train_number, _, _, timestamp, vid = row[:8]
+        self.add(operation, formation, vid, train_number, timestamp)
+
+    def confidence(self, entry):
+        total = self.op_sightings[entry.operation]
+        return entry.sightings / total if total else 0.0
+
+    def rows(self):
+        # 運用順、同じ運用の中は確からしさの高い順
+        out = []
+        for entry in sorted(self.entries.values(),
+                            key=lambda e: (e.operation, -e.sightings, e.first_seen)):
+            out.append([self.day, entry.operation, entry.formation, entry.vehicle_id,
+                        entry.first_seen, entry.last_seen, entry.sightings, entry.matched,
+                        f"{self.confidence(entry):.2f}"])
+        return out
+
+    def state(self):
+        return [tuple(getattr(e, f) for f in RosterEntry.__slots__) for e in self.entries.values()]
+
+    @classmethod
+    def from_state(cls, day, state):
+        roster = cls(day)
+        for op, formation, vid, first, last, sightings, matched in state:
+            entry = roster.entries[(op, formation)] = RosterEntry(op, formation, vid, first)
+            entry.last_seen = last
+            entry.sightings = sightings
+            entry.matched = matched
+            roster.op_sightings[op] += sightings
+        return roster
+
+    def write_csv(self, path):
+        # 一時ファイル → rename で差し替える（読む側が書きかけを見ない）
+        buf = io.StringIO(newline="")
+        writer = csv.writer(buf)
+        writer.writerow(ROSTER_HEADER)
+        writer.writerows(self.rows())
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8-sig") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, path)
+
+
+class RosterBuilder:
+    # ロガーの CSV を追記分だけ読んで、日ごとの Roster を育てる
+    def __init__(self):
+        self.rosters = {}   # 日付 → Roster
+        self.offsets = {}   # ファイル名（log_key）→ 読み終えたバイト位置
+        self.dirty = set()  # 前回書き出してから変わった日付
+
+    def state(self):
+        # チェックポイント用。クラスは pickle しない（python roster.py でも cli.py でも読めるように）
+        return {
+            "offsets": dict(self.offsets),
+            "rosters": {day: r.state() for day, r in self.rosters.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        builder = cls()
+        builder.offsets = dict(state["offsets"])
+        builder.rosters = {day: Roster.from_state(day, s) for day, s in state["rosters"].items()}
+        return builder
+
+    def add_row(self, row):
+        if len(row) < 8:
+            return False
+        day = row[6][:10]
+        roster = self.rosters.get(day)
+        if roster is None:
+            roster = self.rosters[day] = Roster(day)
+        roster.add_row(row)
+        self.dirty.add(day)
+        return True
+
+    def consume(self, path):
+        # path の前回の続きから読み、足した行数を返す
+        key = log_key(path)
+        rows, self.offsets[key] = read_appended(path, self.offsets.get(key, 0))
+        return sum(self.add_row(row) for row in rows)
+
+
+def log_files(paths):
+    # ディレクトリなら中のロガーの CSV（latest・roster を除く）を古い順に
+    out = []
+    for p in map(Path, paths):
+        files = sorted(p.rglob("*.csv")) if p.is_dir() else [p]
+        out += [f for f in files if not f.name.endswith("_latest.csv") and "_roster_" not in f.name]
+    return out
+
+
+def log_key(path):
+    # 読んだ位置を覚えるときのキー。artifact ごとに置き場所が違っても同じファイルは同じキー
+    return Path(path).name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ロガーの CSV から 運用 × 編成 の一覧を作る")
+    parser.add_argument("paths", nargs="*", default=["csv"], help="CSV かディレクトリ")
+    parser.add_argument("--out", default="roster", help="roster_<日付>.csv の出力先")
+    parser.add_argument("--state", default="roster", help="読んだ位置を覚えておく場所")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    checkpoint = Checkpoint(args.state, "roster_state")
+    state = checkpoint.load()
+    builder = RosterBuilder.from_state(state) if state else RosterBuilder()
+    for path in log_files(args.paths):
+        added = builder.consume(path)
+        if added:
+            print(f"{path}: {added} 行")
+    for day in sorted(builder.dirty):
+        out = Path(args.out) / f"roster_{day}.csv"
+        builder.rosters[day].write_csv(out)
+        print(f"{out}: {len(builder.rosters[day].entries)} 件")
+    builder.dirty.clear()
+    checkpoint.save(builder.state())
+
+
+if __name__ == "__main__":
+    main()
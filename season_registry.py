@@ -0,0 +1,134 @@
+import json, sys
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+
+from timetable_cache import is_fresh, load_compiled
+
+# === ダイヤ（シーズン）の登録簿 ===
+# data/<season>/ を探して、season.json の effective_from から有効期間を決める。
+# 有効期間は次のシーズンの effective_from の前日まで。
+# 改正日が仮置きのシーズンは season.json に "confirmed": false を書いておき、
+# その日付の前後 UNCONFIRMED_MARGIN_DAYS 日に入る日を選ぶときは警告を出す
+# （境目が本当はずれていれば、別のダイヤで照合していることになるため）。
+# 日付ごとに必要なシーズンだけ読み込み、最近使ったものを LRU で残しておく。
+# 登録簿は data_root ごとに1つを shared_registry() で共有する（NumberLogger を日ごとに
+# 作り直しても、replay のワーカーが何日分も処理しても、読み込んだダイヤを使い回せる）。
+
+DATA_ROOT = Path("data")
+CACHE_SIZE = 2
+UNCONFIRMED_MARGIN_DAYS = 92
+
+
+def day_suffix(day):
+    # 土日 or 祝日 を「holiday」扱いにする（jpholiday は平日のときだけ読む）
+    if day.weekday() >= 5:
+        return "holiday"
+    import jpholiday
+    return "holiday" if jpholiday.is_holiday(day) else "weekday"
+
+
+class Season:
+    def __init__(self, name, path, effective_from, confirmed=True):
+        self.name = name
+        self.path = path
+        self.effective_from = effective_from
+        self.confirmed = confirmed  # False なら effective_from は仮置き
+        self.effective_until = None  # 次のシーズンの前日（最新なら None）
+
+    def covers(self, day):
+        if day < self.effective_from:
+            return False
+        return self.effective_until is None or day <= self.effective_until
+
+    def __repr__(self):
+        mark = "" if self.confirmed else "（改正日は仮置き）"
+        return f"Season({self.name}, {self.effective_from}〜{self.effective_until or ''}){mark}"
+
+
+def discover_seasons(data_root=DATA_ROOT):
+    seasons = []
+    for meta in sorted(Path(data_root).glob("*/season.json")):
+        base = meta.parent
+        if not any(base.glob("timetable*.csv")):
+            continue
+        with open(meta, encoding="utf-8") as f:
+            info = json.load(f)
+        seasons.append(Season(base.name, base, date.fromisoformat(info["effective_from"]),
+                              info.get("confirmed", True)))
+    seasons.sort(key=lambda s: s.effective_from)
+    for prev, nxt in zip(seasons, seasons[1:]):
+        prev.effective_until = date.fromordinal(nxt.effective_from.toordinal() - 1)
+    return seasons
+
+
+class SeasonRegistry:
+    def __init__(self, data_root=DATA_ROOT, cache_size=CACHE_SIZE):
+        self.seasons = discover_seasons(data_root)
+        self.by_name = {s.name: s for s in self.seasons}
+        self.cache_size = cache_size
+        self._loaded = OrderedDict()  # season 名 → CompiledSeason（LRU）
+        self._warned = set()  # 警告を出した (日付, 境目のシーズン名)
+
+    def season_for(self, day):
+        for s in reversed(self.seasons):
+            if s.covers(day):
+                self._check_boundary(day, s)
+                return s
+        if self.seasons and day < self.seasons[0].effective_from:
+            self._check_boundary(day, self.seasons[0])
+            return self.seasons[0]  # 登録より前の日付は一番古いダイヤで代用
+        raise LookupError(f"{day} に使えるダイヤがありません")
+
+    def unconfirmed_boundary(self, day):
+        # day の近くに仮置きの改正日があればそのシーズンを返す
+        for s in self.seasons:
+            if not s.confirmed and abs((day - s.effective_from).days) <= UNCONFIRMED_MARGIN_DAYS:
+                return s
+        return None
+
+    def _check_boundary(self, day, chosen):
+        near = self.unconfirmed_boundary(day)
+        if near is None or (day, near.name) in self._warned:
+            return
+        self._warned.add((day, near.name))
+        print(f"警告: {near.name} の改正日 {near.effective_from} は仮置きです。"
+              f"{day} は {chosen.name} のダイヤで照合しますが、境目が違えば結果も変わります",
+              file=sys.stderr)
+
+    def compiled(self, name):
+        season = self.by_name[name]
+        if name in self._loaded and is_fresh(self._loaded[name], season.path):
+            self._loaded.move_to_end(name)
+            return self._loaded[name]
+        compiled = load_compiled(season.path, season.name)
+        self._loaded[name] = compiled
+        while len(self._loaded) > self.cache_size:
+            self._loaded.popitem(last=False)
+        return compiled
+
+    def compiled_for(self, day):
+        return self.compiled(self.season_for(day).name)
+
+    def timetable_for(self, day, season=None):
+        # day（と平日/休日）に使う (TimetableIndex, used_files, 運用表) を返す
+        compiled = self.compiled(season) if season else self.compiled_for(day)
+        suffix = day_suffix(day)
+        index, used_files = compiled.timetable(suffix)
+        return index, used_files, compiled.op_table(suffix)
+
+
+_shared = {}
+
+
+def shared_registry(data_root=DATA_ROOT):
+    # 同じプロセスでは data_root ごとに1つ
+    key = Path(data_root).resolve()
+    if key not in _shared:
+        _shared[key] = SeasonRegistry(data_root)
+    return _shared[key]
+
+
+if __name__ == "__main__":
+    for s in SeasonRegistry().seasons:
+        print(s)
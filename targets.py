@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from vehicle_registry import load_registry
+
+# === 取得対象（id / rosen_group_id ごと） ===
+# 同じ unko_map_simple.ajax.php で取れる路線グループを並べておく。
+# それぞれ自分の時刻表セット・出力ファイルを持つ。
+# 編成名は data/vehicles.json（vehicle_registry）から operator_id ごとに引く。
+
+URL = "https://buscatch.jp/rt3/unko_map_simple.ajax.php"
+HEADERS = {"User-Agent": "Mozilla/5.0", "X-Requested-With": "XMLHttpRequest"}
+
+class Target:
+    def __init__(self, name, operator_id, rosen_group_id, data_root=None, season=None,
+                 id_map=None, csv_prefix=None):
+        self.name = name
+        self.operator_id = operator_id
+        self.rosen_group_id = rosen_group_id
+        self.data_root = Path(data_root) if data_root else None  # 時刻表なしなら None
+        self.season = season  # None なら日付から data_root 以下のダイヤを選ぶ
+        self.id_map = id_map  # 指定すると登録簿の代わりにこれを使う（ベンチマーク用など）
+        self.csv_prefix = csv_prefix or f"train_log_{name}"
+
+    def id_map_for(self, day):
+        # day に有効な vehicle_id → 編成
+        if self.id_map is not None:
+            return self.id_map
+        return load_registry().id_map(self.operator_id, day)
+
+    @property
+    def payload(self):
+        return {"id": self.operator_id, "command": "get_unko_list",
+                "rosen_group_id": self.rosen_group_id}
+
+
+TARGETS = [
+    # 既存の出力名（csv/train_log_<日時>.csv）を保つため csv_prefix は "train_log"
+    Target("chitetsu", "chitetsu_train", "2235", data_root="data", csv_prefix="train_log"),
+]
+
+
+def select_targets(names):
+    # 名前の指定がなければ先頭（地鉄）だけ
+    if not names:
+        return TARGETS[:1]
+    by_name = {t.name: t for t in TARGETS}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise SystemExit(f"不明な対象: {', '.join(unknown)}（候補: {', '.join(by_name)}）")
+    return [by_name[n] for n in names]
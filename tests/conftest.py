@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from timetable_index import TimetableIndex  # noqa: E402
+
+COLUMNS = ["line", "direction", "train_number", "station", "minutes", "source_file"]
+
+
+def make_index(rows):
+    # rows: (line, direction, 列番, 駅, 0時からの分, ファイル名)
+    return TimetableIndex.from_frame(pd.DataFrame(rows, columns=COLUMNS))
+
+
+def trip_rows(line, direction, number, stops, source="t.csv"):
+    # stops: [(駅, 分), ...] → make_index に渡す行
+    return [(line, direction, number, station, m, source) for station, m in stops]
+
+
+@pytest.fixture
+def small_index():
+    # 本線下りの「電鉄富山」に 10:00 と 10:20、上りに 10:10
+    return make_index([
+        ("honsen", "down", "101", "電鉄富山", 600, "a.csv"),
+        ("honsen", "down", "103", "電鉄富山", 620, "a.csv"),
+        ("honsen", "up", "202", "電鉄富山", 610, "b.csv"),
+    ])
+
+
+@pytest.fixture
+def line_index():
+    # 本線下りの3本（A→B→C→D）と、同じ駅を逆にたどる上り1本
+    rows = []
+    rows += trip_rows("honsen", "down", "101", [("A", 600), ("B", 610), ("C", 620), ("D", 630)])
+    rows += trip_rows("honsen", "down", "103", [("A", 605), ("B", 615), ("C", 625), ("D", 635)])
+    rows += trip_rows("honsen", "down", "105", [("A", 660), ("B", 670), ("C", 680), ("D", 690)])
+    rows += trip_rows("honsen", "up", "202", [("D", 640), ("C", 650), ("B", 660), ("A", 670)])
+    return make_index(rows)
+
+
+@pytest.fixture(scope="session")
+def season_2026():
+    # 実ファイル（data/2026）の平日ダイヤ。キャッシュは読み書きしない
+    from timetable_cache import compile_season
+    return compile_season(ROOT / "data" / "2026", "2026")
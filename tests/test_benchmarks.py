@@ -0,0 +1,59 @@
+# pytest-benchmark があるときだけ（pip install -r requirements-dev.txt）。
+# 大きさを変えて細かく見るときは python cli.py bench matching / bench logger
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import ROOT  # noqa: E402
+from records import PollFrame  # noqa: E402
+from timetable_index import find_train_number  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def queries(season_2026):
+    index, _ = season_2026.timetable("weekday")
+    rng = random.Random(0)
+    pool = [(station, m * 60, line, direction)
+            for (line, direction, station), (minutes, _, _) in index.items() for m in minutes]
+    out = []
+    for _ in range(1000):
+        station, sec, line, direction = rng.choice(pool)
+        out.append((station, (sec + rng.randint(-1200, 1200)) % 86400, line, direction))
+    return index, out
+
+
+def test_bench_load_timetables(benchmark):
+    from timetable_loader import load_timetables, season_files
+    files = [f for f in season_files(ROOT / "data" / "2026", "2026", "weekday") if f[0].exists()]
+    frame, _ = benchmark(load_timetables, files)
+    assert len(frame)
+
+
+def test_bench_within_1k(benchmark, queries):
+    index, qs = queries
+    benchmark(lambda: [index.within(*q) for q in qs])
+
+
+def test_bench_within_batch_1k(benchmark, queries):
+    index, qs = queries
+    assert benchmark(index.within_batch, qs) == [index.within(*q) for q in qs]
+
+
+def test_bench_find_train_number(benchmark, queries):
+    from datetime import datetime
+    index, qs = queries
+    station, sec, line, direction = qs[0]
+    ts = datetime(2026, 4, 1, sec // 3600, sec % 3600 // 60)
+    benchmark(find_train_number, station, ts, 0, line, direction, index)
+
+
+def test_bench_poll_frame(benchmark):
+    rng = random.Random(0)
+    trains = [{"vehicle_id": i, "teiryujo_name": "電鉄富山駅", "headsign": "宇奈月温泉",
+               "keito_name": rng.choice(["本線", "立山線", "不二越・上滝線"]),
+               "rosen_name": rng.choice(["上り", "下り"]), "keito_rosen_name": "",
+               "delay_sec": 60} for i in range(200)]
+    frame = benchmark(PollFrame.from_trains, trains)
+    assert len(frame) == 200
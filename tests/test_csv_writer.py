@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from csv_writer import RotatingCsvWriter, read_appended
+
+HEADER = ["a", "b"]
+
+
+def _names(tmp_path):
+    return sorted(p.name for p in tmp_path.glob("log_2*.csv"))
+
+
+def test_rotates_on_date_change(tmp_path):
+    w = RotatingCsvWriter("log", HEADER, csv_dir=tmp_path)
+    w.write_batch([["1", "x"]], datetime(2026, 10, 17, 23, 55))
+    w.write_batch([["2", "y"]], datetime(2026, 10, 18, 0, 0))
+    w.close()
+    assert _names(tmp_path) == ["log_2026-10-17_23-55.csv", "log_2026-10-18_00-00.csv"]
+    assert read_appended(tmp_path / "log_2026-10-18_00-00.csv")[0] == [["2", "y"]]
+
+
+def test_rotates_on_size_within_same_minute(tmp_path):
+    w = RotatingCsvWriter("log", HEADER, csv_dir=tmp_path, max_bytes=10)
+    now = datetime(2026, 10, 17, 6, 0)
+    w.write_batch([["1", "x" * 20]], now)
+    w.write_batch([["2", "y"]], now)
+    w.close()
+    assert _names(tmp_path) == ["log_2026-10-17_06-00.csv", "log_2026-10-17_06-00_2.csv"]
+
+
+def test_latest_keeps_tail(tmp_path):
+    w = RotatingCsvWriter("log", HEADER, csv_dir=tmp_path, latest_rows=2)
+    now = datetime(2026, 10, 17, 6, 0)
+    w.write_batch([["1", "x"], ["2", "y"]], now)
+    w.write_batch([["3", "z"]], now)
+    w.close()
+    text = (tmp_path / "log_latest.csv").read_text(encoding="utf-8")
+    assert text.splitlines() == ["a,b", "2,y", "3,z"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_read_appended_leaves_partial_line(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_bytes("\ufeffa,b\r\n1,x\r\n2,".encode("utf-8"))
+    rows, offset = read_appended(path)
+    assert rows == [["1", "x"]]
+    with open(path, "ab") as f:
+        f.write(b"y\r\n")
+    assert read_appended(path, offset) == ([["2", "y"]], path.stat().st_size)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import ROOT
+
+JST = timezone(timedelta(hours=9))
+START = datetime(2026, 10, 17, 6, 0, tzinfo=JST)
+
+
+@pytest.fixture
+def daemon_env(monkeypatch, tmp_path):
+    # 出力・state は tmp_path に、時刻表はリポジトリの data/ から読む
+    monkeypatch.chdir(ROOT)
+    import daemon
+    from fake_server import SyntheticFleet
+    from targets import Target
+    fleet = SyntheticFleet(10, START, step_sec=300)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(daemon, "state_dir", tmp_path / "state")
+    monkeypatch.setattr(daemon, "archive_dir", None)
+    target = Target("chitetsu", "chitetsu_train", "2235", data_root=ROOT / "data", id_map={},
+                    csv_prefix="train_log")
+    return daemon.Daemon, target, fleet
+
+
+def _poll(d, fleet, polls):
+    for _ in range(polls):
+        now = fleet.clock
+        d.handle({"chitetsu": fleet.next()}, now)
+
+
+def test_checkpoint_resume(daemon_env, tmp_path):
+    Daemon, target, fleet = daemon_env
+    first = Daemon([target], START)
+    _poll(first, fleet, 5)
+    logger = first.loggers["chitetsu"]
+    tracked = set(logger.tracker.states)
+    locked = set(logger.matcher.locked)
+    first.close()
+    assert (tmp_path / "state" / "chitetsu.pkl").exists()
+
+    second = Daemon([target], fleet.clock)
+    restored = second.loggers["chitetsu"]
+    assert set(restored.tracker.states) == tracked and tracked
+    assert set(restored.matcher.locked) == locked
+    second.close()
+
+
+def test_rollover_reopens_and_keeps_segments(daemon_env, tmp_path):
+    Daemon, target, fleet = daemon_env
+    d = Daemon([target], START)
+    _poll(d, fleet, 3)
+    before = d.loggers["chitetsu"]
+    segments = before.eta.segments
+
+    tomorrow = START + timedelta(days=1)
+    d.handle({"chitetsu": fleet.next()}, tomorrow)
+    after = d.loggers["chitetsu"]
+    assert after is not before and d.day == tomorrow.date()
+    assert after.eta.segments is segments
+    assert after.writer.path.name.startswith("train_log_2026-10-18")
+    d.close()
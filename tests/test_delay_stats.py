@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from delay_stats import DelayStats, main
+
+
+def _add(stats, station, hour, delays, line="honsen", direction="down", number="101"):
+    n = len(delays)
+    stats.add(np.array([line] * n), np.array([direction] * n), np.array([station] * n),
+              np.array([number] * n), [hour * 3600 + 60] * n, delays)
+
+
+@pytest.fixture
+def stats():
+    s = DelayStats()
+    # 7時の電鉄富山: 定時50本・1分遅れ40本・10分遅れ10本
+    _add(s, "電鉄富山", 7, [0] * 50 + [60] * 40 + [600] * 10)
+    _add(s, "電鉄富山", 8, [120] * 10)
+    _add(s, "上市", 7, [-30] * 4, direction="up", number="202")
+    return s
+
+
+def test_report_quantiles_and_mean(stats):
+    rows = stats.report(("station",), hour=7, line="honsen", direction="down")
+    assert rows == [["電鉄富山", 100, 84.0, 0, 60, 600]]
+
+
+def test_report_groups_by_hour(stats):
+    rows = stats.report(("station", "hour"))
+    assert [r[:3] for r in rows] == [["上市", "07", 4], ["電鉄富山", "07", 100],
+                                     ["電鉄富山", "08", 10]]
+    assert rows[0][3:] == [-30.0, -30, -30, -30]
+
+
+@pytest.mark.parametrize("hour", [7, "7", "07"])
+def test_hour_filter_accepts_unpadded(stats, hour):
+    rows = stats.report(("station",), hour=hour)
+    assert [(r[0], r[1]) for r in rows] == [("上市", 4), ("電鉄富山", 100)]
+
+
+def test_report_cli_hour(stats, tmp_path, capsys):
+    stats.save(tmp_path / "delay_stats.npz")
+    main(["--dir", str(tmp_path), "report", "--hour", "8"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == ["station\tn\tmean\tp50\tp90\tp99", "電鉄富山\t10\t120.0\t120\t120\t120"]
@@ -0,0 +1,40 @@
+import pytest
+
+from eta import ALPHA, EtaEstimator, SegmentTimes
+from trip_matcher import build_trips
+
+
+@pytest.fixture
+def trip(line_index):
+    # A 600 → B 610 → C 620 → D 630（分）
+    return build_trips(line_index)[("honsen", "down", "101")]
+
+
+def test_learn_moves_ratio_toward_observed(trip):
+    segments = SegmentTimes()
+    segments.learn(trip, 0, 2, 40 * 60)  # 20分のところを40分 → 比 2.0
+    assert segments.ratio(trip, 0) == pytest.approx(1 + ALPHA)
+    assert segments.ratio(trip, 1) == pytest.approx(1 + ALPHA)
+    assert segments.ratio(trip, 2) == 1.0
+    segments.learn(trip, 1, 1, 60)  # 同じ駅は学習しない
+    assert segments.ratio(trip, 1) == pytest.approx(1 + ALPHA)
+
+
+def test_eta_and_position(trip):
+    est = EtaEstimator()
+    est.observe(1, trip, 0, 602 * 60, 120)  # A を2分遅れ
+    assert est.eta(1) == [("B", 612 * 60), ("C", 622 * 60), ("D", 632 * 60)]
+    assert est.position(1, 607 * 60) == ("A", "B", 0.5)
+    assert est.position(1, 640 * 60) == ("D", None, 0.0)
+    snap = est.snapshot(607 * 60)["1"]
+    assert snap["train_number"] == "101" and snap["eta"][0] == ["B", "10:12"]
+
+
+def test_observe_learns_and_retain_drops(trip):
+    est = EtaEstimator()
+    est.observe(1, trip, 0, 600 * 60, 0)
+    est.observe(1, trip, 1, 615 * 60, 300)  # A→B に15分（時刻表は10分）
+    assert est.segments.ratio(trip, 0) == pytest.approx(1 + ALPHA * 0.5)
+    est.observe(2, trip, 0, 600 * 60, 0)
+    est.retain({2})
+    assert est.eta(1) == [] and est.eta(2)
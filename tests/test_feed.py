@@ -0,0 +1,88 @@
+import http.client
+import json
+from datetime import datetime
+from urllib.parse import urlparse
+
+import pytest
+
+from feed import FeedServer, LiveFeed, TargetFeed
+
+HEADER = ["vehicle_id", "station"]
+NOW = datetime(2026, 10, 17, 6, 0)
+
+
+def test_delta_since_and_removed():
+    feed = TargetFeed(HEADER)
+    feed.update([["1", "A"], ["2", "B"]], {"1", "2"}, NOW)
+    assert feed.delta()["full"] and feed.seq == 2
+    feed.update([["1", "C"]], {"1"}, NOW)  # 1 が動いて 2 が消えた
+    delta = feed.delta(2)
+    assert not delta["full"]
+    assert delta["vehicles"] == [{"vehicle_id": "1", "station": "C"}]
+    assert delta["removed"] == ["2"]
+    assert feed.delta(99)["full"]  # 未来の seq（再起動前のもの）は全件
+
+
+@pytest.fixture
+def server():
+    feed = LiveFeed(HEADER, ["chitetsu"])
+    feed.update("chitetsu", [["1", "A"]], None, NOW)
+    server = FeedServer(feed, port=0, heartbeat_sec=0.2).start()
+    yield feed, server
+    server.stop()
+
+
+def _conn(server):
+    url = urlparse(server.url)
+    return http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+
+
+def test_state_etag_304(server):
+    feed, srv = server
+    conn = _conn(srv)
+    conn.request("GET", "/api/state?target=chitetsu")
+    r = conn.getresponse()
+    body = json.loads(r.read())
+    etag = r.getheader("ETag")
+    assert (r.status, body["seq"], etag) == (200, 1, '"chitetsu-1"')
+
+    conn.request("GET", "/api/state?target=chitetsu", headers={"If-None-Match": etag})
+    r = conn.getresponse()
+    r.read()
+    assert r.status == 304
+
+    feed.update("chitetsu", [["2", "B"]], None, NOW)
+    conn.request("GET", "/api/state?target=chitetsu&since=1", headers={"If-None-Match": etag})
+    r = conn.getresponse()
+    assert r.status == 200
+    assert json.loads(r.read())["vehicles"] == [{"vehicle_id": "2", "station": "B"}]
+    conn.close()
+
+
+def _event(response):
+    # 次の "id: ...\ndata: ..." を読む（keep-alive のコメント行は飛ばす）
+    fields = {}
+    while True:
+        line = response.fp.readline().decode("utf-8").rstrip("\n")
+        if not line:
+            if fields:
+                return int(fields["id"]), json.loads(fields["data"])
+            continue
+        if not line.startswith(":"):
+            key, _, value = line.partition(": ")
+            fields[key] = value
+
+
+def test_events_stream_deltas(server):
+    feed, srv = server
+    conn = _conn(srv)
+    conn.request("GET", "/api/events?target=chitetsu")
+    r = conn.getresponse()
+    assert r.getheader("Content-Type").startswith("text/event-stream")
+    seq, first = _event(r)
+    assert seq == 1 and first["full"]
+    feed.update("chitetsu", [["1", "B"]], None, NOW)
+    seq, delta = _event(r)
+    assert seq == 2 and not delta["full"]
+    assert delta["vehicles"] == [{"vehicle_id": "1", "station": "B"}]
+    conn.close()
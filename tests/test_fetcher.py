@@ -0,0 +1,94 @@
+import time
+from datetime import datetime
+
+import pytest
+import requests
+
+import metrics
+from fake_server import FakeUnkoServer
+from fetcher import FetchError, Fetcher
+
+PAYLOAD = {"command": "get_unko_list"}
+
+
+class SameFleet:
+    # 毎回同じ車両リストを返す
+    def __init__(self, trains):
+        self.trains = trains
+
+    def next(self):
+        return self.trains
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(fleet=None, **kwargs):
+        server = FakeUnkoServer(fleet or SameFleet([{"vehicle_id": 1}]), **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def _fetcher(server, **kwargs):
+    kwargs.setdefault("backoff_sec", 0.01)
+    kwargs.setdefault("max_backoff_sec", 0.05)
+    return Fetcher(server.url, PAYLOAD, {}, timeout=5, **kwargs)
+
+
+def _cycle():
+    return metrics.Cycle(datetime(2026, 10, 17, 6, 0))
+
+
+def test_retries_within_budget_then_gives_up(serve):
+    server = serve(error_rate=1.0)
+    fetcher = _fetcher(server, retry_budget_sec=0.3)
+    cycle = _cycle()
+    started = time.monotonic()
+    with pytest.raises(FetchError):
+        metrics.context_for(cycle).run(fetcher.fetch_body)
+    elapsed = time.monotonic() - started
+    fetcher.close()
+    # 0.01, 0.02, 0.04, 0.05, ... と待って、次の待ちが予算を越えたところでやめる
+    assert fetcher.attempts > 3
+    assert server.requests == fetcher.attempts
+    assert elapsed < 0.3 + 0.5
+    assert cycle.counts["http_error"] == fetcher.attempts
+
+
+def test_transient_errors_are_retried(serve):
+    server = serve(error_rate=0.5, seed=1)
+    fetcher = _fetcher(server, retry_budget_sec=5)
+    for _ in range(5):
+        assert fetcher.fetch_body() == b'[{"vehicle_id": 1}]'
+    fetcher.close()
+    assert server.errors > 0
+    assert server.requests == 5 + server.errors
+
+
+def test_4xx_is_not_retried_but_counted(serve):
+    server = serve(error_rate=1.0, error_status=403)
+    fetcher = _fetcher(server, retry_budget_sec=5)
+    cycle = _cycle()
+    with pytest.raises(requests.HTTPError):
+        metrics.context_for(cycle).run(fetcher.fetch_body)
+    fetcher.close()
+    assert fetcher.attempts == 1
+    assert server.requests == 1
+    assert cycle.counts["http_error"] == 1
+
+
+def test_unchanged_body_is_skipped(serve):
+    fleet = SameFleet([{"vehicle_id": 1, "teiryujo_name": "電鉄富山駅"}])
+    server = serve(fleet)
+    fetcher = _fetcher(server)
+    assert fetcher.fetch() == fleet.trains
+    assert fetcher.fetch() is None  # 同じ本文 → 後段を省く
+    fleet.trains = [{"vehicle_id": 1, "teiryujo_name": "稲荷町駅"}]
+    assert fetcher.fetch() == fleet.trains
+    fetcher.close()
+    assert server.requests == 3
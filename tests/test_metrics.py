@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+
+import metrics
+
+
+def test_timer_records_known_stages_only():
+    cycle = metrics.Cycle(datetime(2026, 10, 17, 6, 0))
+
+    def work():
+        with metrics.timer("match"):
+            metrics.inc("skip", 2)
+        with metrics.timer("matching"):
+            pass
+
+    with pytest.raises(ValueError):
+        metrics.context_for(cycle).run(work)
+    assert list(cycle.stages) == ["match"]
+    assert cycle.counts == {"skip": 2}
+
+
+def test_writer_emits_jsonl_and_prom(tmp_path):
+    cycle = metrics.Cycle(datetime(2026, 10, 17, 6, 0))
+    cycle.add("fetch", 0.5)
+    writer = metrics.MetricsWriter(tmp_path, prom_path=tmp_path / "trainlog.prom")
+    writer.emit(cycle)
+    assert (tmp_path / "poll_2026-10-17.jsonl").read_text().count("\n") == 1
+    prom = (tmp_path / "trainlog.prom").read_text()
+    assert 'trainlog_stage_seconds_total{stage="fetch"} 0.500000' in prom
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import ROOT
+
+JST = timezone(timedelta(hours=9))
+START = datetime(2026, 10, 17, 6, 0, tzinfo=JST)  # 土曜（休日ダイヤ）
+
+
+@pytest.fixture
+def fleet_run(monkeypatch, tmp_path):
+    # 時刻表から作った架空の車両を NumberLogger に流す（data/ とキャッシュはリポジトリのもの）
+    monkeypatch.chdir(ROOT)
+    from fake_server import SyntheticFleet
+    from number_logger import NumberLogger
+    from targets import TARGETS
+
+    def run(logger, fleet, polls):
+        for _ in range(polls):
+            now = fleet.clock
+            logger.handle(fleet.next(), now)
+        return logger
+
+    def make(start=START):
+        return NumberLogger(TARGETS[0], start, csv_dir=tmp_path, live=False)
+
+    return SyntheticFleet, make, run, tmp_path
+
+
+def _rows(tmp_path):
+    import csv
+    rows = []
+    for path in sorted(tmp_path.glob("train_log_2*.csv")):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows += list(csv.reader(f))[1:]
+    return rows
+
+
+def test_synthetic_fleet_match_rate(fleet_run):
+    # 時刻表どおりに走る車両は、記録した行のほとんどに列番と運用が付く
+    SyntheticFleet, make, run, tmp_path = fleet_run
+    logger = run(make(), SyntheticFleet(30, START, step_sec=120), 200)
+    logger.close()
+    rows = _rows(tmp_path)
+    assert len(rows) > 300
+    matched = sum(r[3] != "合致なし" for r in rows) / len(rows)
+    assert matched >= 0.95
+    assert all(r[10] and r[11] for r in rows)  # line / direction は必ず入る
+
+
+def test_restore_continues_roster_and_matching(fleet_run):
+    SyntheticFleet, make, run, tmp_path = fleet_run
+    fleet = SyntheticFleet(20, START, step_sec=300)
+    first = run(make(), fleet, 20)
+    snapshot = first.snapshot()
+    entries = len(first.roster.entries)
+    first.close()
+
+    second = make(fleet.clock)
+    assert second.restore(snapshot)
+    assert len(second.roster.entries) == entries
+    run(second, fleet, 2)
+    second.close()
+    assert len(second.roster.entries) >= entries
+
+
+def test_vehicles_leaving_the_feed_drop_their_eta(fleet_run):
+    SyntheticFleet, make, run, tmp_path = fleet_run
+    fleet = SyntheticFleet(20, START.replace(hour=7), step_sec=120)
+    logger = run(make(fleet.clock), fleet, 10)
+    trains = fleet.next()[:5]
+    logger.handle(trains, fleet.clock)
+    logger.close()
+    present = {t["vehicle_id"] for t in trains}
+    assert set(logger.eta.predictions) <= present
+    assert set(logger.eta.last) <= present
+
+
+def test_parked_vehicle_is_matched_once_departure_is_in_window(fleet_run):
+    # 電鉄富山で 04:40 から止まっている本線下り（ST1 は 05:10 発）。
+    # 05:10 の 15分前（窓の端）からは列番が付き、number_reassignment が記録される
+    _, make, _, tmp_path = fleet_run
+    train = {"vehicle_id": 1, "teiryujo_name": "電鉄富山駅", "keito_name": "本線",
+             "rosen_name": "下り", "keito_rosen_name": "", "delay_sec": 0, "headsign": "宇奈月温泉"}
+    start = START.replace(hour=4, minute=40)
+    logger = make(start)
+    for k in range(7):  # 04:40〜05:10 を5分ごと
+        logger.handle([train], start + timedelta(minutes=5 * k))
+    logger.close()
+    rows = _rows(tmp_path)
+    assert [(r[6][11:], r[3], r[8]) for r in rows] == [
+        ("04:40", "合致なし", "new_trip"),
+        ("04:55", "ST1", "number_reassignment"),
+    ]
+
+
+def test_loggers_share_loaded_timetable(fleet_run):
+    # 日をまたいで作り直しても、同じダイヤは読み込み直さない（登録簿は共有）
+    _, make, _, _ = fleet_run
+    first = make()
+    second = make(START + timedelta(days=1))  # 日曜も休日ダイヤ
+    assert second.timetable_index is first.timetable_index
+    first.close()
+    second.close()
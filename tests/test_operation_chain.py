@@ -0,0 +1,64 @@
+import pytest
+
+from operation_chain import BIND, SWAP, OperationChain
+from timetable_index import NO_MATCH
+from trip_matcher import build_trips
+
+
+@pytest.fixture
+def chain(line_index):
+    # 運用 1 = 101 → 202、運用 2 = 103 → 105
+    return OperationChain({"1": ["101", "202"], "2": ["103", "105"]}, build_trips(line_index))
+
+
+def test_bind_then_advance(chain):
+    assert chain.update("v1", "101") == BIND
+    assert chain.operation("v1") == "1"
+    assert chain.update("v1", "202") is None  # 運用の先へ進んだだけ
+    assert chain.bound["v1"] == ("1", 1)
+
+
+def test_no_match_keeps_binding(chain):
+    chain.update("v1", "101")
+    assert chain.update("v1", NO_MATCH) is None
+    assert chain.operation_for("v1", NO_MATCH) == "1"
+    assert chain.operation_for("v1", "999") is None  # 運用表にない列番
+
+
+def test_swap_to_other_operation(chain):
+    chain.update("v1", "101")
+    assert chain.update("v1", "105") == SWAP
+    assert chain.operation("v1") == "2"
+    assert chain.holders == {"2": "v1"}
+
+
+def test_earlier_number_in_own_operation_is_not_a_swap(chain):
+    # 202 と誤照合したあと 101 に直った → 運用は同じなので SWAP にしない
+    chain.update("v1", "202")
+    assert chain.update("v1", "101") is None
+    assert chain.bound["v1"] == ("1", 0)
+
+
+def test_takeover_unbinds_previous_holder(chain):
+    chain.update("v1", "101")
+    assert chain.update("v2", "202") == BIND
+    assert chain.holders["1"] == "v2"
+    assert chain.operation("v1") is None
+
+
+def test_expected_next_trip(chain):
+    chain.update("v1", "101")
+    # 101 の走行中は 101、終着後の窓を過ぎたら次の 202
+    assert chain.expected("v1", 615 * 60).train_number == "101"
+    assert chain.expected("v1", 630 * 60 + 901).train_number == "202"
+    assert chain.expected("v1", 670 * 60 + 901) is None
+    assert chain.expected("v2", 615 * 60) is None
+
+
+def test_snapshot_restore_drops_unknown_operations(chain, line_index):
+    chain.update("v1", "101")
+    chain.update("v2", "105")
+    other = OperationChain({"1": ["101", "202"]}, build_trips(line_index))
+    other.restore(chain.snapshot())
+    assert other.bound == {"v1": ("1", 0)}
+    assert other.holders == {"1": "v1"}
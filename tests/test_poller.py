@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from poller import JST, adaptive_interval, next_tick, run_polling
+
+
+def test_adaptive_interval():
+    interval = adaptive_interval(300)
+    assert interval(datetime(2026, 10, 17, 7, 30)) == 150   # ラッシュ
+    assert interval(datetime(2026, 10, 17, 12, 0)) == 300
+    assert interval(datetime(2026, 10, 17, 23, 0)) == 600   # 深夜
+    assert interval(datetime(2026, 10, 17, 5, 59)) == 600
+
+
+def test_next_tick_aligns_to_wall_clock():
+    assert next_tick(datetime(2026, 10, 17, 6, 3, 30), 300) == 90   # 06:05 まで
+    assert next_tick(datetime(2026, 10, 17, 6, 5, 0), 300) == 300   # ちょうどなら次の周期
+
+
+class _Metrics:
+    def __init__(self):
+        self.cycles = []
+
+    def emit(self, cycle):
+        self.cycles.append(cycle)
+
+
+def test_tick_order_and_counts():
+    # 応答あり → 前回と同じ（None）→ エラー → 応答あり
+    responses = iter([[1], None, RuntimeError("boom"), [2]])
+
+    def fetch():
+        r = next(responses)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+    handled, errors = [], []
+    metrics = _Metrics()
+    run_polling(fetch, lambda trains, now: handled.append(trains), 0.01, max_runs=4,
+                on_error=lambda now, e: errors.append(str(e)), metrics=metrics)
+    assert handled == [[1], [2]]
+    assert errors == ["boom"]
+    assert len(metrics.cycles) == 4
+    counts = [dict(c.counts) for c in metrics.cycles]
+    assert {"unchanged_response": 1} in counts and {"fetch_failed": 1} in counts
+    assert all(c.now.tzinfo is JST for c in metrics.cycles)
+
+
+def test_should_stop_ends_before_fetch():
+    calls = []
+    run_polling(lambda: calls.append(1), lambda trains, now: None, 0.01,
+                should_stop=lambda now: len(calls) >= 2)
+    assert len(calls) == 2
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta, timezone
+
+from conftest import ROOT
+
+JST = timezone(timedelta(hours=9))
+DAY = datetime(2026, 10, 17, 6, 0, tzinfo=JST)
+
+
+def _archive(tmp_path):
+    from fake_server import SyntheticFleet
+    from raw_archive import RawArchive
+    archive = RawArchive(tmp_path / "archive", "chitetsu")
+    fleet = SyntheticFleet(10, DAY, step_sec=300)
+    for _ in range(20):
+        now = fleet.clock
+        archive.append(fleet.next(), now)
+    return archive.path_for(DAY.date())
+
+
+def test_rerun_replaces_previous_output(monkeypatch, tmp_path):
+    monkeypatch.chdir(ROOT)
+    from replay import replay_day
+    path = _archive(tmp_path)
+    out = tmp_path / "replay"
+
+    replay_day("chitetsu", path, out)
+    first = {p.name: p.read_bytes() for p in out.iterdir()}
+    replay_day("chitetsu", path, out)
+    second = {p.name: p.read_bytes() for p in out.iterdir()}
+
+    assert second == first  # _2.csv が増えず、中身も同じ
+    assert sorted(first) == ["train_log_2026-10-17_06-00.csv", "train_log_roster_2026-10-17.csv"]
@@ -0,0 +1,50 @@
+from number_logger import CSV_HEADER
+from roster import Roster, RosterBuilder, log_files
+
+DAY = "2026-10-17"
+
+
+def _row(operation, formation, number, time, vid):
+    return [operation, formation, "宇奈月温泉", number, "電鉄富山", "t.csv",
+            f"{DAY} {time}", vid, "new_trip", "0", "honsen", "down"]
+
+
+def test_confidence_and_order():
+    roster = Roster(DAY)
+    roster.add_row(_row("1", "10031F", "101", "06:00", "1"))
+    roster.add_row(_row("1", "10031F", "合致なし", "06:10", "1"))
+    roster.add_row(_row("1", "14761F", "103", "05:50", "2"))
+    roster.add_row(_row("不明", "14762F", "合致なし", "06:00", "3"))  # 運用不明は数えない
+    rows = roster.rows()
+    assert [r[1:4] for r in rows] == [["1", "10031F", "1"], ["1", "14761F", "2"]]
+    assert rows[0][4:] == [f"{DAY} 06:00", f"{DAY} 06:10", 2, 1, "0.67"]
+    assert Roster.from_state(DAY, roster.state()).rows() == rows
+
+
+def _write_log(path, rows):
+    import csv
+    with open(path, "a", newline="", encoding="utf-8-sig" if not path.exists() else "utf-8") as f:
+        w = csv.writer(f)
+        if f.tell() == 0:
+            w.writerow(CSV_HEADER)
+        w.writerows(rows)
+
+
+def test_builder_reads_only_appended_rows_once(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    _write_log(a / "train_log_2026-10-17_06-00.csv", [_row("1", "10031F", "101", "06:00", "1")])
+    # 別の artifact に同じファイルが入っていても二重に数えない
+    (b / "train_log_2026-10-17_06-00.csv").write_bytes(
+        (a / "train_log_2026-10-17_06-00.csv").read_bytes())
+    (a / "train_log_latest.csv").write_text("x\n")
+
+    builder = RosterBuilder()
+    assert [p.name for p in log_files([a])] == ["train_log_2026-10-17_06-00.csv"]
+    assert sum(builder.consume(p) for p in log_files([a, b])) == 1
+
+    _write_log(a / "train_log_2026-10-17_06-00.csv", [_row("1", "10031F", "103", "06:20", "1")])
+    restored = RosterBuilder.from_state(builder.state())
+    assert sum(restored.consume(p) for p in log_files([a, b])) == 1
+    assert restored.rosters[DAY].entries[("1", "10031F")].sightings == 2
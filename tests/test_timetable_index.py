@@ -0,0 +1,66 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from timetable_index import BATCH_MIN_QUERIES, MATCH_WINDOW_SEC, NO_MATCH, find_train_number
+
+W = MATCH_WINDOW_SEC
+
+
+@pytest.mark.parametrize("station, ts, delay, line, dirn, want", [
+    ("電鉄富山", datetime(2026, 4, 1, 10, 0), 0, "honsen", "down", "101"),
+    ("電鉄富山", datetime(2026, 4, 1, 9, 45), 0, "honsen", "down", "101"),      # 窓の端（-900秒）
+    ("電鉄富山", datetime(2026, 4, 1, 9, 44), 0, "honsen", "down", NO_MATCH),   # 窓の外（-960秒）
+    ("電鉄富山", datetime(2026, 4, 1, 9, 44), -60, "honsen", "down", "101"),    # 遅延で窓に入る
+    ("電鉄富山", datetime(2026, 4, 1, 10, 25), 300, "honsen", "down", "103"),   # 遅延を引く
+    ("電鉄富山", datetime(2026, 4, 1, 10, 11), 0, "honsen", "down", "103"),     # 近いほう
+    ("電鉄富山", datetime(2026, 4, 1, 10, 0), 0, "honsen", "up", "202"),        # 方向で絞る
+    ("電鉄富山", datetime(2026, 4, 1, 10, 9), 0, None, None, "202"),            # 方向不明なら全部
+    ("電鉄富山", datetime(2026, 4, 1, 10, 0), 0, "tateyama", None, NO_MATCH),   # 路線違い
+    ("寺田", datetime(2026, 4, 1, 10, 0), 0, None, None, NO_MATCH),             # 駅なし
+    ("電鉄富山", "2026-04-01 10:19", 0, "honsen", "down", "103"),               # 文字列の時刻
+])
+def test_find_train_number_window(small_index, station, ts, delay, line, dirn, want):
+    assert find_train_number(station, ts, delay, line, dirn, small_index)[0] == want
+
+
+@pytest.mark.parametrize("offset, want", [(W, "202"), (W + 1, None), (-W, "202"), (-(W + 1), None)])
+def test_nearest_window_edges(small_index, offset, want):
+    hit = small_index.nearest("電鉄富山", 610 * 60 + offset, "honsen", "up")
+    assert (hit[0] if hit else None) == want
+
+
+@pytest.mark.parametrize("offset, want", [(W, ["202"]), (W + 1, []), (-W, ["202"]), (-(W + 1), [])])
+def test_within_window_edges(small_index, offset, want):
+    got = small_index.within("電鉄富山", 610 * 60 + offset, "honsen", "up")
+    assert [number for number, *_ in got] == want
+
+
+def test_within_lists_every_candidate_in_window(small_index):
+    got = small_index.within("電鉄富山", 610 * 60, "honsen", None)
+    assert sorted(number for number, *_ in got) == ["101", "103", "202"]
+
+
+def _random_queries(index, n, seed=0):
+    rng = random.Random(seed)
+    stations = sorted({key[2] for key in index.keys()}) + ["存在しない駅"]
+    return [(rng.choice(stations), rng.randrange(86400),
+             rng.choice((None, "honsen", "tateyama", "fuzikoshikamitaki")),
+             rng.choice((None, "up", "down"))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("n", [0, 5, BATCH_MIN_QUERIES, 3000])
+def test_within_batch_matches_within(season_2026, n):
+    # 少ないとき（within を順に呼ぶ）も多いとき（searchsorted）も within と同じ結果・並び
+    index, _ = season_2026.timetable("weekday")
+    queries = _random_queries(index, n)
+    assert index.within_batch(queries) == [index.within(*q) for q in queries]
+
+
+def test_within_batch_after_pickle(season_2026):
+    # キャッシュから読んだインデックス（_joined なし）でも使える
+    import pickle
+    index = pickle.loads(pickle.dumps(season_2026.timetable("holiday")[0]))
+    queries = _random_queries(index, 500, seed=1)
+    assert index.within_batch(queries) == [index.within(*q) for q in queries]
@@ -0,0 +1,114 @@
+from conftest import make_index, trip_rows
+from timetable_index import NO_MATCH
+from trip_matcher import SKIP_PENALTY_MIN, TripMatcher, align_cost, build_trips
+
+
+def _trip(index, number, line="honsen", direction="down"):
+    return build_trips(index)[(line, direction, number)]
+
+
+def test_align_cost_follows_stop_order(line_index):
+    trip = _trip(line_index, "101")
+    # 時刻どおりに A→B→C
+    assert align_cost(trip, [("A", 600 * 60), ("B", 610 * 60), ("C", 620 * 60)]) == 0
+    # 2分遅れは 2分ずつ
+    assert align_cost(trip, [("A", 602 * 60), ("B", 612 * 60)]) == 4
+
+
+def test_align_cost_does_not_go_backwards(line_index):
+    trip = _trip(line_index, "101")
+    # C で見たあとに B（逆戻り）→ 両方は対応させられないので、C の観測をスキップした分のコスト
+    assert align_cost(trip, [("C", 620 * 60), ("B", 610 * 60)]) == SKIP_PENALTY_MIN
+    assert align_cost(trip, [("B", 610 * 60), ("C", 620 * 60)]) == 0
+
+
+def test_align_cost_skips_unknown_station(line_index):
+    trip = _trip(line_index, "101")
+    cost = align_cost(trip, [("X", 600 * 60), ("B", 610 * 60)])
+    assert cost == SKIP_PENALTY_MIN
+
+
+def test_align_cost_rejects_last_observation_outside_window(line_index):
+    trip = _trip(line_index, "101")
+    assert align_cost(trip, [("A", 600 * 60), ("B", 640 * 60)]) is None
+
+
+def test_history_separates_close_trips(line_index):
+    # 101 と 103 は5分差。B だけなら近いほうだが、A からの並びで 101 に決まる
+    m = TripMatcher(line_index)
+    assert m.observe(1, "A", 600 * 60, "honsen", "down")[0] == "101"
+    assert m.observe(1, "B", 613 * 60, "honsen", "down")[0] == "101"
+
+
+def test_locks_and_follows_without_rematch(line_index):
+    m = TripMatcher(line_index)
+    assert m.observe(1, "A", 600 * 60, "honsen", "down") == ("101", "t.csv")
+    trip, pos = m.locked[1]
+    assert (trip.train_number, pos) == ("101", 0)
+    # ロック中は103の方が近くても先の停車駅に沿っている限りそのまま
+    assert not m.needs_lookup(1, "C", 624 * 60)
+    assert m.observe(1, "C", 624 * 60, "honsen", "down")[0] == "101"
+    assert m.locked[1][1] == 2
+
+
+def test_lock_released_when_trip_is_left(line_index):
+    m = TripMatcher(line_index)
+    m.observe(1, "A", 600 * 60, "honsen", "down")
+    # 1時間後に A → 101 の先ではないので照合し直して 105
+    assert m.needs_lookup(1, "A", 660 * 60)
+    assert m.observe(1, "A", 660 * 60, "honsen", "down")[0] == "105"
+
+
+def test_expected_trip_is_taken_without_rematch(line_index):
+    m = TripMatcher(line_index)
+    expected = _trip(line_index, "202", direction="up")
+    # 方向が分からなくても運用から予測した列車に沿っていればそれを採る
+    assert m.observe(1, "C", 650 * 60, None, None, expected=expected)[0] == "202"
+
+
+def test_no_match_and_reset(line_index):
+    m = TripMatcher(line_index)
+    assert m.observe(1, "A", 300 * 60, "honsen", "down") == (NO_MATCH, None)
+    assert 1 not in m.locked
+    m.observe(1, "A", 600 * 60, "honsen", "down")
+    m.reset(1)
+    assert 1 not in m.locked and 1 not in m.histories
+
+
+def test_candidates_from_lookup_batch_give_same_result(line_index):
+    queries = [("B", 611 * 60, "honsen", "down"), ("C", 651 * 60, "honsen", "up")]
+    batch = TripMatcher(line_index).lookup_batch(queries)
+    for vid, (q, candidates) in enumerate(zip(queries, batch)):
+        a, b = TripMatcher(line_index), TripMatcher(line_index)
+        assert a.observe(vid, *q) == b.observe(vid, *q, candidates=candidates)
+
+
+def test_snapshot_restore_keeps_lock(line_index):
+    m = TripMatcher(line_index)
+    m.observe(1, "A", 600 * 60, "honsen", "down")
+    restored = TripMatcher(make_index(
+        trip_rows("honsen", "down", "101", [("A", 600), ("B", 610), ("C", 620), ("D", 630)])))
+    restored.restore(m.snapshot())
+    assert restored.locked[1][0].train_number == "101"
+    assert restored.observe(1, "B", 610 * 60, "honsen", "down")[0] == "101"
+
+
+def test_turnaround_does_not_keep_previous_trip(line_index):
+    # 101（A→D、D 着 630）→ 202（D→A、D 発 640）の運用で、D で折り返した直後の観測
+    from operation_chain import OperationChain
+    m = TripMatcher(line_index)
+    chain = OperationChain({"1": ["101", "202"]}, build_trips(line_index))
+    number, _ = m.observe(1, "D", 630 * 60, "honsen", "down",
+                          expected=chain.expected(1, 630 * 60))
+    chain.update(1, number)
+    assert number == "101"
+
+    # 方向が up になった → 終わった 101 を予測されても採らない
+    m.reset(1)
+    stale = chain.expected(1, 634 * 60)
+    assert stale.train_number == "101"
+    assert m.observe(1, "D", 634 * 60, "honsen", "up", expected=stale)[0] == "202"
+
+    # 運用の位置を進めれば予測そのものが 202 になる
+    chain.advance(1, 634 * 60)
+    assert chain.expected(1, 634 * 60).train_number == "202"
@@ -0,0 +1,49 @@
+import json
+from datetime import date
+
+import pytest
+
+from vehicle_registry import VehicleRegistry, suggest, unknown_label
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "vehicles.json"
+    path.write_text(json.dumps({
+        "order": ["10031F", "14761F", "16013F"],
+        "operators": {"chitetsu_train": [
+            {"vehicle_id": "1", "formation": "10031F", "valid_until": "2026-09-30"},
+            {"vehicle_id": "1", "formation": "14761F", "valid_from": "2026-10-01"},
+            {"vehicle_id": "2", "formation": "16013F", "confirmed": False},
+        ]},
+    }), encoding="utf-8")
+    return VehicleRegistry.load(path)
+
+
+def test_id_map_by_day_and_unconfirmed_mark(registry):
+    assert registry.id_map("chitetsu_train", date(2026, 9, 30)) == {"1": "10031F", "2": "16013F?"}
+    assert registry.id_map("chitetsu_train", date(2026, 10, 1))["1"] == "14761F"
+    assert registry.id_map("other", date(2026, 10, 1)) == {}
+
+
+def test_rank_ignores_mark(registry):
+    assert registry.rank("16013F?") == registry.rank("16013F") == 2
+    assert registry.rank(unknown_label(9)) == registry.rank(None) == 3
+
+
+def test_check_finds_overlap(registry):
+    assert registry.check() == []
+    registry.operators["chitetsu_train"][0].valid_until = date(2026, 10, 5)
+    assert len(registry.check()) == 1
+
+
+def test_suggest_excludes_formations_seen_same_day(registry):
+    def row(op, formation, day, vid):
+        return [op, formation, "", "101", "", "", f"{day} 06:00", vid]
+    rows = [
+        row("1", "10031F", "2026-10-10", "1"),
+        row("1", "14761F", "2026-10-11", "1"),
+        row("1", unknown_label(9), "2026-10-12", "9"),
+        row("1", "10031F", "2026-10-12", "1"),  # 同じ日に別の場所 → 9 ではない
+    ]
+    assert suggest(rows, registry) == {"9": [("14761F", 1.0)]}
@@ -0,0 +1,50 @@
+from vehicle_state import (HEADSIGN_CHANGE, NEW_TRIP, NUMBER_REASSIGNMENT, STATION_CHANGE,
+                           VehicleTracker)
+
+
+def test_first_sighting_is_new_trip():
+    t = VehicleTracker()
+    assert t.changed(1, "A", "宇奈月温泉", "honsen", "down")
+    assert t.update(1, "A", "宇奈月温泉", "honsen", "down", "101", "a.csv") == [NEW_TRIP]
+
+
+def test_unchanged_vehicle_is_skipped():
+    t = VehicleTracker()
+    t.update(1, "A", "宇奈月温泉", "honsen", "down", "101", "a.csv")
+    assert not t.changed(1, "A", "宇奈月温泉", "honsen", "down")
+
+
+def test_station_headsign_and_number_events():
+    t = VehicleTracker()
+    t.update(1, "A", "宇奈月温泉", "honsen", "down", "101", "a.csv")
+    assert t.update(1, "B", "宇奈月温泉", "honsen", "down", "101", "a.csv") == [STATION_CHANGE]
+    assert t.update(1, "B", "上市", "honsen", "down", "103", "a.csv") == [HEADSIGN_CHANGE,
+                                                                         NUMBER_REASSIGNMENT]
+
+
+def test_direction_change_is_new_trip():
+    t = VehicleTracker()
+    t.update(1, "D", "宇奈月温泉", "honsen", "down", "101", "a.csv")
+    assert t.is_new_trip(1, "honsen", "up")
+    assert t.update(1, "D", "電鉄富山", "honsen", "up", "202", "a.csv") == [NEW_TRIP]
+
+
+def test_snapshot_restore():
+    t = VehicleTracker()
+    t.update(1, "A", "宇奈月温泉", "honsen", "down", "101", "a.csv")
+    other = VehicleTracker()
+    other.restore(t.snapshot())
+    assert not other.changed(1, "A", "宇奈月温泉", "honsen", "down")
+    assert other.get(1).train_number == "101"
+
+
+def test_no_match_is_rechecked_while_parked():
+    # 合致なしのまま止まっている車両は、次のポーリングでも照合し直す
+    from timetable_index import NO_MATCH
+    t = VehicleTracker()
+    t.update(1, "電鉄富山", "宇奈月温泉", "honsen", "down", NO_MATCH, None)
+    assert t.changed(1, "電鉄富山", "宇奈月温泉", "honsen", "down")
+    assert t.update(1, "電鉄富山", "宇奈月温泉", "honsen", "down", NO_MATCH, None) == []
+    assert t.update(1, "電鉄富山", "宇奈月温泉", "honsen", "down", "ST1", "a.csv") == [
+        NUMBER_REASSIGNMENT]
+    assert not t.changed(1, "電鉄富山", "宇奈月温泉", "honsen", "down")
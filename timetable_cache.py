@@ -0,0 +1,152 @@
+import hashlib, os, pickle, sys, tempfile
+from pathlib import Path
+
+from timetable_index import TimetableIndex
+from unyo import build_reverse_map, load_unyo_table
+
+# === 時刻表・運用表のコンパイル済みキャッシュ ===
+# data/<season>/ の CSV と運用表を読み込んだ結果（駅インデックス・時刻・逆引き辞書）を
+# 1つの pickle にまとめる。元ファイルの mtime かハッシュが変わったら作り直す。
+
+CACHE_DIR = Path("cache")
+CACHE_VERSION = 3
+SUFFIXES = ("weekday", "holiday")
+
+
+class CompiledSeason:
+    def __init__(self, season, sources, timetables, op_tables):
+        self.season = season
+        self.sources = sources        # ファイル名 → (mtime_ns, size, sha1)
+        self.timetables = timetables  # suffix → (TimetableIndex, used_files)
+        self.op_tables = op_tables    # suffix → 運用 → 列番の並び
+        self.op_maps = {s: build_reverse_map(t) for s, t in op_tables.items()}  # 列番 → 運用
+
+    def timetable(self, suffix):
+        return self.timetables[suffix]
+
+    def op_map(self, suffix):
+        return self.op_maps[suffix]
+
+    def op_table(self, suffix):
+        return self.op_tables[suffix]
+
+
+def cache_path(season, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f"timetable_{season}.pkl"
+
+
+def _source_paths(base_dir):
+    return sorted(base_dir.glob("timetable*.csv")) + sorted(base_dir.glob("*unyo.txt"))
+
+
+def _sha1(path):
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def _fingerprint(paths):
+    out = {}
+    for p in paths:
+        st = p.stat()
+        out[p.name] = (st.st_mtime_ns, st.st_size, _sha1(p))
+    return out
+
+
+def _is_fresh(compiled, paths):
+    # mtime とサイズが同じならハッシュは見ない。
+    # checkout で mtime だけ変わった場合はハッシュが同じなら使い回す
+    if set(compiled.sources) != {p.name for p in paths}:
+        return False
+    for p in paths:
+        mtime_ns, size, sha1 = compiled.sources[p.name]
+        st = p.stat()
+        if st.st_mtime_ns == mtime_ns and st.st_size == size:
+            continue
+        if st.st_size != size or _sha1(p) != sha1:
+            return False
+    return True
+
+
+def compile_season(base_dir, season=None):
+    # pandas を読むのは作り直すときだけ
+    from timetable_loader import load_timetables, season_files
+
+    base_dir = Path(base_dir)
+    season = season or base_dir.name
+    paths = _source_paths(base_dir)
+
+    timetables = {}
+    for suffix in SUFFIXES:
+        frame, used_files = load_timetables(season_files(base_dir, season, suffix))
+        timetables[suffix] = (TimetableIndex.from_frame(frame), used_files)
+
+    unyo = sorted(base_dir.glob("*unyo.txt"))
+    if unyo:
+        weekday_ops, holiday_ops = load_unyo_table(unyo[0])
+    else:
+        weekday_ops, holiday_ops = {}, {}
+    op_tables = {"weekday": weekday_ops, "holiday": holiday_ops}
+    return CompiledSeason(season, _fingerprint(paths), timetables, op_tables)
+
+
+def write_compiled(compiled, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 一時ファイルは書き手ごとに別の名前にする（同時に作り直しても互いの一時ファイルを消さない）
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.stem + ".", suffix=".tmp",
+                                     delete=False) as f:
+        try:
+            pickle.dump((CACHE_VERSION, compiled), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def read_compiled(path):
+    try:
+        with open(path, "rb") as f:
+            version, compiled = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError,
+            ImportError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION:
+        return None
+    return compiled
+
+
+def is_fresh(compiled, base_dir):
+    # 読み込み済みの CompiledSeason がまだ元ファイルと合っているか（stat だけで済むことが多い）
+    return _is_fresh(compiled, _source_paths(Path(base_dir)))
+
+
+# === キャッシュ読み込み（古ければ作り直す） ===
+def load_compiled(base_dir, season=None, cache_dir=CACHE_DIR):
+    base_dir = Path(base_dir)
+    season = season or base_dir.name
+    path = cache_path(season, cache_dir)
+    compiled = read_compiled(path)
+    paths = _source_paths(base_dir)
+    if compiled is not None and _is_fresh(compiled, paths):
+        if any(compiled.sources[p.name][0] != p.stat().st_mtime_ns for p in paths):
+            # 中身は同じで mtime だけ変わった → 次回ハッシュ計算しなくて済むよう更新
+            compiled.sources = _fingerprint(paths)
+            write_compiled(compiled, path)
+        return compiled
+    compiled = compile_season(base_dir, season)
+    write_compiled(compiled, path)
+    return compiled
+
+
+def main(argv=None):
+    # python timetable_cache.py [data/2026 data/2025W ...]（省略時は data/ 以下の全ダイヤ）
+    argv = sys.argv[1:] if argv is None else argv
+    default = sorted({p.parent for p in Path("data").glob("*/timetable*.csv")})
+    for arg in argv or default:
+        c = load_compiled(arg)
+        print(f"{cache_path(c.season)}: {len(c.sources)} files, "
+              + ", ".join(f"{s}={len(c.timetable(s)[0])}" for s in SUFFIXES))
+
+
+if __name__ == "__main__":
+    main()
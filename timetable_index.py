@@ -0,0 +1,175 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from records import StringTable
+
+# === 時刻表インデックス ===
+# (line, direction, station) ごとに時刻（0時からの分）を昇順に並べた配列を持ち、
+# 列番照合は全行スキャンではなく bisect で最寄りの時刻を探す。
+# 分は array("h")、列番・ファイル名は StringTable の番号を array("I") で持つ
+# （停車ごとに文字列を持たないので、キャッシュもメモリも小さくなる）。
+# 1回のポーリングの全車両の候補は within_batch でまとめて引く（全 key を通して searchsorted 2回）。
+# NumPy はそのときに初めて読む（ライブの照合は numpy・pandas なしで起動する）。
+
+MATCH_WINDOW_SEC = 900  # ±15分以内なら採用
+BATCH_MIN_QUERIES = 64  # within_batch はこれ以上のときだけ NumPy で引く（少ないと bisect の方が速い）
+NO_MATCH = "合致なし"
+
+
+class TimetableIndex:
+    def __init__(self):
+        # key → (分の昇順 array, 列番の番号 array, 時刻表ファイル名の番号 array)
+        self._entries = {}
+        self.strings = StringTable()
+        # station → その駅を含む key 一覧（line / direction 不明時の照合用）
+        self._by_station = {}
+        # within_batch 用の1本の配列と、key ごとの先頭の位置（初回に作る。キャッシュには書かない）
+        self._joined = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_joined"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._joined = None
+
+    @classmethod
+    def from_frame(cls, timetable):
+        # timetable_loader.load_timetables が返す縦持ち表から作る
+        index = cls()
+        ordered = timetable.sort_values("minutes", kind="stable")  # 同時刻はファイル順を保つ
+        groups = ordered.groupby(["line", "direction", "station"], observed=True, sort=False)
+        # 駅ごとの key の並びは元の表での出現順にそろえる
+        keys = timetable[["line", "direction", "station"]].astype(str).drop_duplicates()
+        for key in keys.itertuples(index=False, name=None):
+            key = tuple(sys.intern(k) for k in key)
+            index._by_station.setdefault(key[2], []).append(key)
+        strings = index.strings
+        for key, g in groups:
+            key = tuple(sys.intern(str(k)) for k in key)
+            index._entries[key] = (
+                array("h", g["minutes"].tolist()),
+                array("I", [strings.id(n) for n in g["train_number"].astype(str).tolist()]),
+                array("I", [strings.id(f) for f in g["source_file"].astype(str).tolist()]),
+            )
+        return index
+
+    def keys(self):
+        return self._entries.keys()
+
+    def __len__(self):
+        return sum(len(v[0]) for v in self._entries.values())
+
+    def nearest(self, station, seconds, line=None, direction=None,
+                window=MATCH_WINDOW_SEC):
+        # seconds: 遅延補正済みの 0時からの秒。窓内で最も近い (列番, ファイル名) を返す
+        best = None
+        best_diff = window + 1
+        for key in self._by_station.get(station, ()):
+            if line is not None and key[0] != line:
+                continue
+            if direction is not None and key[1] != direction:
+                continue
+            minutes, numbers, sources = self._entries[key]
+            pos = bisect_left(minutes, seconds / 60)
+            for i in (pos - 1, pos):
+                if 0 <= i < len(minutes):
+                    diff = abs(seconds - minutes[i] * 60)
+                    if diff < best_diff:
+                        best_diff = diff
+                        best = (self.strings[numbers[i]], self.strings[sources[i]])
+        return best
+
+
+    def within(self, station, seconds, line=None, direction=None, window=MATCH_WINDOW_SEC):
+        # 窓内にある全候補を (列番, line, direction, 分) で返す（列車単位の照合用）
+        out = []
+        for key in self._by_station.get(station, ()):
+            if line is not None and key[0] != line:
+                continue
+            if direction is not None and key[1] != direction:
+                continue
+            minutes, numbers, _ = self._entries[key]
+            lo = bisect_left(minutes, (seconds - window) / 60)
+            hi = bisect_right(minutes, (seconds + window) / 60)
+            names = self.strings.names
+            out.extend((names[numbers[i]], key[0], key[1], minutes[i]) for i in range(lo, hi))
+        return out
+
+    def within_batch(self, queries, window=MATCH_WINDOW_SEC):
+        # queries: [(station, seconds, line, direction), ...]。within を全件まとめて引き、
+        # 問い合わせごとの候補のリストを within と同じ並びで返す。
+        # 全 key の時刻を「key の番号 × 2^16 + 分」の1本の昇順配列にしてあるので、
+        # (問い合わせ, key) の組すべての窓の両端を searchsorted 2回で求められる。
+        # 1回のポーリングの車両が少ないうちは within を順に呼ぶ（numpy も読まない）
+        if len(queries) < BATCH_MIN_QUERIES:
+            return [self.within(*q, window=window) for q in queries]
+        import numpy as np
+
+        flat, base, starts = self._flat()
+        owner, keys, lo, hi = [], [], [], []
+        for n, (station, seconds, line, direction) in enumerate(queries):
+            for key in self._by_station.get(station, ()):
+                if line is not None and key[0] != line:
+                    continue
+                if direction is not None and key[1] != direction:
+                    continue
+                owner.append(n)
+                keys.append(key)
+                lo.append(base[key] + (seconds - window) / 60)
+                hi.append(base[key] + (seconds + window) / 60)
+        out = [[] for _ in queries]
+        if not owner:
+            return out
+        lo = np.searchsorted(flat, np.array(lo), "left").tolist()
+        hi = np.searchsorted(flat, np.array(hi), "right").tolist()
+        names = self.strings.names
+        for n, key, a, b in zip(owner, keys, lo, hi):
+            if a == b:
+                continue
+            minutes, numbers, _ = self._entries[key]
+            start = starts[key]
+            out[n].extend((names[numbers[i]], key[0], key[1], minutes[i])
+                          for i in range(a - start, b - start))
+        return out
+
+    def _flat(self):
+        # within_batch 用の1本の配列（初回に作る。キャッシュには書かない）
+        if self._joined is None:
+            import numpy as np
+
+            parts, base, starts = [], {}, {}
+            offset = 0
+            for k, (key, (minutes, _, _)) in enumerate(self._entries.items()):
+                base[key] = (k << 16) + 32768  # 分は array("h") なので 2^16 の幅に収まる
+                starts[key] = offset
+                parts.append(np.frombuffer(minutes, dtype=np.int16).astype(np.int64) + base[key])
+                offset += len(minutes)
+            flat = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+            self._joined = (flat, base, starts)
+        return self._joined
+
+    def items(self):
+        # ((line, direction, station), (分, 列番, ファイル名)) を全部（列番・ファイル名は文字列に戻す）
+        names = self.strings.names
+        for key, (minutes, numbers, sources) in self._entries.items():
+            yield key, (minutes, [names[n] for n in numbers], [names[f] for f in sources])
+
+
+def seconds_of_day(ts):
+    return ts.hour * 3600 + ts.minute * 60 + ts.second
+
+
+# === 列番照合関数 ===
+def find_train_number(station, timestamp, delay_sec, line, dirn, index):
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M")
+    ts_adjusted = timestamp - timedelta(seconds=int(delay_sec or 0))
+    hit = index.nearest(station, seconds_of_day(ts_adjusted), line, dirn)
+    if hit is not None:
+        return hit
+    return NO_MATCH, None
@@ -0,0 +1,67 @@
+import pandas as pd
+
+# === 時刻表読み込み（ベクトル化版） ===
+# 駅 × 列番 の表を stack で縦持ちにし、「レ」「(止)」・空欄を落として
+# HH:MM を一括で分に変換する。行ごとの dict は作らない。
+
+COLUMNS = ["line", "direction", "train_number", "station", "minutes", "source_file"]
+CATEGORY_COLUMNS = ["line", "direction", "train_number", "station", "source_file"]
+LINES = ["honsen", "fuzikoshikamitaki", "tateyama"]
+DIRECTIONS = ["down", "up"]
+
+
+def season_files(base_dir, season, suffix):
+    # data/<season>/timetable<season>_<line>_<direction>_<suffix>.csv の一覧
+    return [
+        (base_dir / f"timetable{season}_{line}_{direction}_{suffix}.csv", line, direction)
+        for line in LINES
+        for direction in DIRECTIONS
+    ]
+
+
+def load_timetable(path, line_type, direction):
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    grid = df.iloc[:, 1:]
+    grid.index = df.iloc[:, 0].str.replace("駅", "").str.strip()
+    cells = grid.stack()
+
+    # 時刻以外（レ・(止)・空欄）はここで落ちる
+    hm = cells.str.strip().str.extract(r"^(\d{1,2}):(\d{2})").dropna()
+    hour = hm[0].astype("int16")
+    minute = hm[1].astype("int16")
+    ok = (hour <= 23) & (minute <= 59)
+    hm = hm[ok]
+
+    out = pd.DataFrame({
+        "line": line_type,
+        "direction": direction,
+        "train_number": hm.index.get_level_values(1).astype(str),
+        "station": hm.index.get_level_values(0).astype(str),
+        "minutes": (hour[ok] * 60 + minute[ok]).to_numpy(),
+        "source_file": path.name,
+    })
+    return _as_categories(out)
+
+
+def load_timetables(files):
+    # files: (path, line, direction) のリスト。存在するものだけ読む
+    frames = []
+    used_files = []
+    for path, line_type, direction in files:
+        if path.exists():
+            frames.append(load_timetable(path, line_type, direction))
+            used_files.append(path.name)   # ファイル名だけ記録
+    if not frames:
+        return _as_categories(pd.DataFrame({c: [] for c in COLUMNS})), used_files
+    # カテゴリの中身がファイルごとに違うので str に戻して結合し、最後にまとめてカテゴリ化する
+    timetable = pd.concat(
+        [f.astype({c: str for c in CATEGORY_COLUMNS}) for f in frames],
+        ignore_index=True,
+    )
+    return _as_categories(timetable), used_files
+
+
+def _as_categories(frame):
+    frame = frame.astype({c: "category" for c in CATEGORY_COLUMNS})
+    frame["minutes"] = frame["minutes"].astype("int16")
+    return frame[COLUMNS]
@@ -1,88 +1,68 @@
-import requests, time, csv, os
-from datetime import datetime, timedelta, timezone
-
-url = "https://buscatch.jp/rt3/unko_map_simple.ajax.php"
-data = {"id": "chitetsu_train", "command": "get_unko_list", "rosen_group_id": "2235"}
-headers = {"User-Agent": "Mozilla/5.0", "X-Requested-With": "XMLHttpRequest"}
-
-id_map = {
-     "5741": "16011F",
-    "5742": "16013F?",
-    "5743": "10031F",
-    "5744": "10033F?",
-    "5746": "10039F",
-    "5747": "10041F",
-    "5748": "10043F",
-    "5749": "10045F?",
-    "5754": "赤14769F?",
-    "5755": "14771F?",
-    "5883": "17481F",
-    "5758": "17483F",
-    "5884": "17485F",
-    "5760": "17487F",
-    "6013": "14773F",
-    "5902": "青14767F",
-    
-}
-formation_order = ["10041F", "14773F", "17481F","17485F","あお"]
-
-JST = timezone(timedelta(hours=9))
-os.makedirs("csv", exist_ok=True)
-
-date_str = datetime.now(JST).strftime("%Y-%m-%d_%H-%M")
-csv_file = f"csv/train_log_{date_str}.csv"
-
-with open(csv_file, "w", newline="", encoding="utf-8-sig") as f:
-    writer = csv.writer(f)
-    writer.writerow(["timestamp", "vehicle_id", "formation_name", "headsign", "station"])
-
-interval_minutes = 20
-max_runs = 18
-start_date = datetime.now(JST).date()
-
-try:
-    for run in range(max_runs):
-        now = datetime.now(JST)
-        if now.date() != start_date:
-            print(f"[{now}] 日付が変わったため終了します")
-            break
-
-        try:
-            response = requests.post(url, headers=headers, data=data, timeout=10)
-            response.raise_for_status()
-            trains = response.json()
-        except Exception as e:
-            print(f"[{now}] エラー発生: {e}")
-        else:
-            sorted_trains = sorted(
-                trains,
-                key=lambda t: formation_order.index(id_map.get(str(t.get("vehicle_id")), f"ID:{t.get('vehicle_id')}"))
-                if id_map.get(str(t.get("vehicle_id"))) in formation_order else len(formation_order)
-            )
-            with open(csv_file, "a", newline="", encoding="utf-8-sig") as f:
-                writer = csv.writer(f)
-                for train in sorted_trains:
-                    vid = train.get("vehicle_id")
-                    formation = id_map.get(str(vid), f"ID:{vid}")
-                    writer.writerow([
-                        now.strftime("%Y-%m-%d %H:%M:%S"),
-                        vid,
-                        formation,
-                        train.get("headsign"),
-                        train.get("teiryujo_name")
-                    ])
-            print(f"[{now}] データを保存しました ({len(sorted_trains)}件)")
-
-        if run < max_runs - 1:
-            time.sleep(interval_minutes * 60)
-
-except KeyboardInterrupt:
-    print("=== 手動終了が検出されました ===")
-finally:
-    print("=== 保存完了 ===")
-
-
-
-
-
-
+from datetime import datetime, timedelta, timezone
+
+from csv_writer import RotatingCsvWriter
+from fetcher import Fetcher
+from poller import run_polling
+from vehicle_registry import load_registry, unknown_label
+
+url = "https://buscatch.jp/rt3/unko_map_simple.ajax.php"
+data = {"id": "chitetsu_train", "command": "get_unko_list", "rosen_group_id": "2235"}
+headers = {"User-Agent": "Mozilla/5.0", "X-Requested-With": "XMLHttpRequest"}
+
+OPERATOR = data["id"]  # 編成名は data/vehicles.json のこの operator の登録から引く
+
+JST = timezone(timedelta(hours=9))
+
+interval_minutes = 20
+max_runs = 18
+
+
+def handle(writer, id_map, trains, now):
+    registry = load_registry()
+    sorted_trains = sorted(
+        trains,
+        key=lambda t: registry.rank(id_map.get(str(t.get("vehicle_id"))))
+    )
+    rows = []
+    for train in sorted_trains:
+        vid = train.get("vehicle_id")
+        formation = id_map.get(str(vid)) or unknown_label(vid)
+        rows.append([
+            now.strftime("%Y-%m-%d %H:%M:%S"),
+            vid,
+            formation,
+            train.get("headsign"),
+            train.get("teiryujo_name")
+        ])
+    writer.write_batch(rows, now)
+    print(f"[{now}] データを保存しました ({len(sorted_trains)}件)")
+
+
+def main():
+    # csv/train_log_<日時>.csv に追記し、csv/train_log_latest.csv を毎回差し替える
+    writer = RotatingCsvWriter("train_log", ["timestamp", "vehicle_id", "formation_name", "headsign", "station"])
+    writer.open(datetime.now(JST))
+    start_date = datetime.now(JST).date()
+    id_map = load_registry().id_map(OPERATOR, start_date)
+
+    # 接続を使い回し、失敗時は次の周期までに再試行する
+    fetcher = Fetcher(url, data, headers, retry_budget_sec=interval_minutes * 60 / 2)
+
+    def date_changed(now):
+        if now.date() != start_date:
+            print(f"[{now}] 日付が変わったため終了します")
+            return True
+        return False
+
+    try:
+        run_polling(fetcher.fetch, lambda trains, now: handle(writer, id_map, trains, now),
+                    interval_minutes * 60, max_runs=max_runs, should_stop=date_changed)
+    except KeyboardInterrupt:
+        print("=== 手動終了が検出されました ===")
+    finally:
+        writer.close()
+        print("=== 保存完了 ===")
+
+
+if __name__ == "__main__":
+    main()
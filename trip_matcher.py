@@ -0,0 +1,169 @@
+from array import array
+from collections import deque
+
+from timetable_index import MATCH_WINDOW_SEC, NO_MATCH
+
+# === 列車単位の列番照合 ===
+# 車両ごとに最近の (駅, 遅延補正後の時刻) を覚えておき、候補列車の停車駅の並び全体と
+# DP で対応付けて一番ずれの小さい列車を選ぶ。1駅だけ見て最寄り時刻を取るより、
+# 折り返し駅や続行運転で取り違えにくい。
+# 一度決まった列車（ロック）は、その先の停車駅に沿っている限り照合し直さない。
+
+HISTORY_LEN = 8
+SKIP_PENALTY_MIN = 10  # どの停車駅にも合わない観測1件あたりのコスト（分）
+
+
+class Trip:
+    __slots__ = ("line", "direction", "train_number", "source_file",
+                 "minutes", "stations", "pos")
+
+    def __init__(self, line, direction, train_number, source_file, stops):
+        stops.sort()
+        self.line = line
+        self.direction = direction
+        self.train_number = train_number
+        self.source_file = source_file
+        self.minutes = array("h", [m for m, _ in stops])
+        self.stations = [st for _, st in stops]
+        self.pos = {}
+        for i, st in enumerate(self.stations):
+            self.pos.setdefault(st, i)
+
+
+def build_trips(index):
+    # 時刻表インデックスを (line, direction, 列番) ごとの停車駅の並びに組み直す
+    stops = {}
+    sources = {}
+    for (line, direction, station), (minutes, numbers, files) in index.items():
+        for m, number, source in zip(minutes, numbers, files):
+            key = (line, direction, number)
+            stops.setdefault(key, []).append((m, station))
+            sources.setdefault(key, source)
+    return {key: Trip(key[0], key[1], key[2], sources[key], s) for key, s in stops.items()}
+
+
+def align_cost(trip, history, window=MATCH_WINDOW_SEC):
+    # history: 古い順の (駅, 秒)。最後の観測は必ず trip の停車駅に対応させる。
+    # 状態 = 直前に対応させた停車駅の位置。位置は戻らない（同じ駅での連続観測は可）
+    INF = float("inf")
+    best = {-1: 0.0}
+    last_pos = None
+    for station, seconds in history:
+        j = trip.pos.get(station)
+        diff = abs(seconds - trip.minutes[j] * 60) if j is not None else None
+        new = {}
+        for pos, cost in best.items():
+            c = cost + SKIP_PENALTY_MIN
+            if c < new.get(pos, INF):
+                new[pos] = c
+            if diff is not None and diff <= window and j >= pos:
+                c = cost + diff / 60
+                if c < new.get(j, INF):
+                    new[j] = c
+        best = new
+        last_pos = j
+    if last_pos is None or last_pos not in best:
+        return None
+    return best[last_pos]
+
+
+def _conflicts(trip, line, direction):
+    # 観測で分かっている路線・方向と違う列車か（分からないものは比べない）
+    return ((line is not None and trip.line != line)
+            or (direction is not None and trip.direction != direction))
+
+
+class TripMatcher:
+    def __init__(self, index, history_len=HISTORY_LEN, window=MATCH_WINDOW_SEC):
+        self.index = index
+        self.window = window
+        self.trips = build_trips(index)
+        self.history_len = history_len
+        self.histories = {}  # vehicle_id → deque[(駅, 秒)]
+        self.locked = {}     # vehicle_id → (Trip, 直前に通った停車駅の位置)
+
+    def reset(self, vid):
+        # 折り返しなどで別の列車になったとき
+        self.histories.pop(vid, None)
+        self.locked.pop(vid, None)
+
+    def snapshot(self):
+        # チェックポイント用。Trip は (line, direction, 列番) のキーで持つ
+        return {
+            "histories": {vid: list(h) for vid, h in self.histories.items()},
+            "locked": {vid: ((t.line, t.direction, t.train_number), pos)
+                       for vid, (t, pos) in self.locked.items()},
+        }
+
+    def restore(self, snapshot):
+        self.histories = {vid: deque(h, maxlen=self.history_len)
+                          for vid, h in snapshot["histories"].items()}
+        # 時刻表が変わって無くなった列車は捨てる（次の観測で照合し直す）
+        self.locked = {vid: (self.trips[key], pos)
+                       for vid, (key, pos) in snapshot["locked"].items() if key in self.trips}
+
+    def _follows(self, trip, station, seconds, pos=0):
+        j = trip.pos.get(station)
+        if j is not None and j >= pos and abs(seconds - trip.minutes[j] * 60) <= self.window:
+            return j
+        return None
+
+    def needs_lookup(self, vid, station, seconds):
+        # ロック中の列車の先の停車駅に沿っていれば、時刻表の候補を引かなくてよい
+        locked = self.locked.get(vid)
+        return locked is None or self._follows(locked[0], station, seconds, locked[1]) is None
+
+    def lookup_batch(self, queries):
+        # [(駅, 秒, line, direction), ...] の候補をまとめて引く（observe の candidates に渡す）
+        return self.index.within_batch(queries, self.window)
+
+    def observe(self, vid, station, seconds, line=None, direction=None, expected=None,
+                candidates=None):
+        # seconds: 遅延補正済みの 0時からの秒。(列番, ファイル名) を返す
+        # expected: 運用のつながりから予測した次の列車（Trip）。路線・方向が観測と食い違わず、
+        #           停車駅と時刻が合っていれば照合し直さない
+        # candidates: lookup_batch で先に引いておいたこの観測の候補（None ならここで引く）
+        history = self.histories.get(vid)
+        if history is None:
+            history = self.histories[vid] = deque(maxlen=self.history_len)
+        history.append((station, seconds))
+
+        # ロック中の列車の先の停車駅に沿っていればそのまま進める
+        locked = self.locked.get(vid)
+        if locked is not None:
+            trip, pos = locked
+            j = self._follows(trip, station, seconds, pos)
+            if j is not None:
+                self.locked[vid] = (trip, j)
+                return trip.train_number, trip.source_file
+            del self.locked[vid]
+
+        if expected is not None and _conflicts(expected, line, direction):
+            expected = None  # 折り返した直後などで、予測が終わった列車を指している
+        if expected is not None:
+            j = self._follows(expected, station, seconds)
+            if j is not None:
+                self.locked[vid] = (expected, j)
+                return expected.train_number, expected.source_file
+
+        if candidates is None:
+            candidates = self.index.within(station, seconds, line, direction, self.window)
+        trip = self._rematch(candidates, history)
+        if trip is None:
+            return NO_MATCH, None
+        self.locked[vid] = (trip, trip.pos[station])
+        return trip.train_number, trip.source_file
+
+    def _rematch(self, candidates, history):
+        best, best_cost = None, None
+        seen = set()
+        for number, t_line, t_dir, _ in candidates:
+            key = (t_line, t_dir, number)
+            if key in seen:
+                continue
+            seen.add(key)
+            trip = self.trips[key]
+            cost = align_cost(trip, history, self.window)
+            if cost is not None and (best_cost is None or cost < best_cost):
+                best, best_cost = trip, cost
+        return best
@@ -0,0 +1,43 @@
+# === 運用表読み込み ===
+# data/<season>/*unyo.txt。pandas を使わないのでキャッシュだけの経路からも読める。
+def load_unyo_table(path):
+    weekday_ops = {}
+    holiday_ops = {}
+    current = None  # "weekday" or "holiday"
+
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+
+            # セクション切り替え
+            if line.lower() == "[weekday]":
+                current = "weekday"
+                continue
+            if line.lower() == "[holiday]":
+                current = "holiday"
+                continue
+
+            # セクション外 or 不正行は無視
+            if "=" not in line or current is None:
+                continue
+
+            op, nums = line.split("=", 1)
+            nums = [n.strip() for n in nums.split(",") if n.strip()]
+
+            if current == "weekday":
+                weekday_ops[op] = nums
+            elif current == "holiday":
+                holiday_ops[op] = nums
+
+    return weekday_ops, holiday_ops
+
+
+# === 逆引き辞書 ===
+def build_reverse_map(op_table):
+    rev = {}
+    for op, nums in op_table.items():
+        for n in nums:
+            rev[n] = op
+    return rev
@@ -0,0 +1,171 @@
+import argparse, json, sys
+from collections import Counter, defaultdict
+from datetime import date
+from pathlib import Path
+
+# === 車両の登録簿 ===
+# data/vehicles.json に operator ごとの vehicle_id → 編成 と有効期間を書いておき、
+# 各ロガーはここから読む（スクリプトごとに id_map を持たない）。
+# 1日分の vehicle_id → 編成 の dict と、編成 → 並び順 の dict は読み込み時に1回だけ作る。
+# confirmed: false の車両は、ログの編成名を「16013F?」のように ? 付きにする（未確認だと分かるように）。
+#
+#   python vehicle_registry.py check               # 同じ vehicle_id の期間の重なりなど
+#   python vehicle_registry.py suggest csv/ ...    # 登録のない ID:xxxx の候補を過去の CSV から
+
+REGISTRY_PATH = Path("data/vehicles.json")
+UNCONFIRMED_MARK = "?"
+
+
+def unknown_label(vid):
+    return f"ID:{vid}"
+
+
+class VehicleEntry:
+    __slots__ = ("vehicle_id", "formation", "valid_from", "valid_until", "confirmed", "note")
+
+    def __init__(self, vehicle_id, formation, valid_from=None, valid_until=None,
+                 confirmed=True, note=None):
+        self.vehicle_id = str(vehicle_id)
+        self.formation = formation
+        self.valid_from = date.fromisoformat(valid_from) if valid_from else None
+        self.valid_until = date.fromisoformat(valid_until) if valid_until else None
+        self.confirmed = confirmed
+        self.note = note  # ログには出さない覚え書き（HM など）
+
+    @property
+    def label(self):
+        # ログに書く編成名（未確認なら ? 付き）
+        return self.formation if self.confirmed else self.formation + UNCONFIRMED_MARK
+
+    def covers(self, day):
+        if self.valid_from is not None and day < self.valid_from:
+            return False
+        return self.valid_until is None or day <= self.valid_until
+
+
+class VehicleRegistry:
+    def __init__(self, operators, order=()):
+        self.operators = operators  # operator_id → [VehicleEntry]
+        self.order = list(order)
+        self.ranks = {f: i for i, f in enumerate(self.order)}  # 編成 → 並び順
+        self._maps = {}  # (operator_id, 日付) → vehicle_id → 編成
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        operators = {op: [VehicleEntry(**e) for e in entries]
+                     for op, entries in raw.get("operators", {}).items()}
+        return cls(operators, raw.get("order", ()))
+
+    def id_map(self, operator, day):
+        # その日に有効な vehicle_id → 編成名（未確認なら ? 付き）
+        key = (operator, day)
+        m = self._maps.get(key)
+        if m is None:
+            m = self._maps[key] = {e.vehicle_id: e.label
+                                   for e in self.operators.get(operator, ()) if e.covers(day)}
+        return m
+
+    def rank(self, formation):
+        # 一覧の並び順。order にない編成（ID:xxxx など）は後ろ。未確認の ? は無視する
+        if formation is None:
+            return len(self.order)
+        return self.ranks.get(formation.rstrip(UNCONFIRMED_MARK), len(self.order))
+
+    def check(self):
+        # 同じ operator で vehicle_id の有効期間が重なっているものを返す
+        problems = []
+        for op, entries in self.operators.items():
+            by_vid = defaultdict(list)
+            for e in entries:
+                by_vid[e.vehicle_id].append(e)
+            for vid, es in by_vid.items():
+                es.sort(key=lambda e: e.valid_from or date.min)
+                for a, b in zip(es, es[1:]):
+                    if a.valid_until is None or (b.valid_from or date.min) <= a.valid_until:
+                        problems.append(f"{op} {vid}: {a.formation} と {b.formation} の"
+                                        "期間が重なっています")
+        return problems
+
+
+_loaded = {}
+
+
+def load_registry(path=REGISTRY_PATH):
+    # 同じプロセスでは1回だけ読む
+    path = Path(path)
+    if path not in _loaded:
+        _loaded[path] = VehicleRegistry.load(path)
+    return _loaded[path]
+
+
+# === 登録のない車両の候補 ===
+def suggest(rows, registry, top=3):
+    # rows: ロガーの CSV の行（number_logger.CSV_HEADER の並び）。
+    # 登録のない vehicle_id ごとに、その車両が結びついた運用を過去に走っていた編成を数え、
+    # 同じ日に別の場所で見えていた編成（＝その車両ではありえない）を除いて多い順に返す
+    unknown_ops = defaultdict(Counter)   # vehicle_id → 運用 → 回数
+    unknown_days = defaultdict(set)
+    formation_ops = defaultdict(Counter)  # 編成 → 運用 → 回数
+    formation_days = defaultdict(set)
+    for row in rows:
+        if len(row) < 8:
+            continue
+        operation, formation, timestamp, vid = row[0], row[1], row[6], row[7]
+        day = timestamp[:10]
+        if formation == unknown_label(vid):
+            unknown_days[vid].add(day)
+            if operation != "不明":
+                unknown_ops[vid][operation] += 1
+        else:
+            formation_days[formation].add(day)
+            if operation != "不明":
+                formation_ops[formation][operation] += 1
+
+    out = {}
+    for vid, ops in unknown_ops.items():
+        total = sum(ops.values())
+        scores = []
+        for formation, fops in formation_ops.items():
+            if formation_days[formation] & unknown_days[vid]:
+                continue
+            overlap = sum(min(n, fops[op]) for op, n in ops.items())
+            if overlap:
+                scores.append((overlap / total, registry.rank(formation), formation))
+        scores.sort(key=lambda s: (-s[0], s[1]))
+        out[vid] = [(formation, round(score, 2)) for score, _, formation in scores[:top]]
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="車両の登録簿（data/vehicles.json）")
+    parser.add_argument("--registry", default=str(REGISTRY_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("check", help="登録の矛盾を調べる")
+    p = sub.add_parser("suggest", help="登録のない ID:xxxx の編成の候補")
+    p.add_argument("paths", nargs="*", default=["csv"])
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    registry = VehicleRegistry.load(args.registry)
+    if args.command == "check":
+        problems = registry.check()
+        for p in problems:
+            print(p)
+        if problems:
+            raise SystemExit(1)
+        print("問題なし")
+        return
+
+    from csv_writer import read_appended
+    from roster import log_files
+    rows = []
+    for path in log_files(args.paths):
+        rows += read_appended(path)[0]
+    for vid, candidates in sorted(suggest(rows, registry).items()):
+        text = ", ".join(f"{f}（{s:.0%}）" for f, s in candidates) or "候補なし"
+        print(f"{unknown_label(vid)}: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# === 車両ごとの状態管理 ===
+# 前回ポーリング時の状態と比べ、変化があった車両だけ列番照合して記録する。
+# 記録する行には何が変わったかを event として付ける。
+# 前回 合致なし だった車両は、止まったままでも毎回照合し直す（発車時刻が窓に入ったら列番が付く）。
+
+from timetable_index import NO_MATCH
+
+NEW_TRIP = "new_trip"                    # 初めて見た / 路線・方向が変わった（折り返し）
+STATION_CHANGE = "station_change"        # 停留所が変わった
+HEADSIGN_CHANGE = "headsign_change"      # 行先が変わった
+NUMBER_REASSIGNMENT = "number_reassignment"  # 照合した列番が変わった
+OPERATION_SWAP = "operation_swap"        # 別の運用に移った（差し替え）
+
+
+class VehicleState:
+    __slots__ = ("station", "headsign", "line", "direction", "train_number", "timetable_file")
+
+    def __init__(self, station, headsign, line, direction, train_number, timetable_file):
+        self.station = station
+        self.headsign = headsign
+        self.line = line
+        self.direction = direction
+        self.train_number = train_number
+        self.timetable_file = timetable_file
+
+
+class VehicleTracker:
+    def __init__(self):
+        self.states = {}  # vehicle_id → VehicleState
+
+    def changed(self, vid, station, headsign, line, direction):
+        # 照合の前に呼ぶ。False なら前回から何も変わっていないので飛ばしてよい
+        s = self.states.get(vid)
+        return (s is None or s.train_number == NO_MATCH or s.station != station
+                or s.headsign != headsign or s.line != line or s.direction != direction)
+
+    def is_new_trip(self, vid, line, direction):
+        s = self.states.get(vid)
+        return s is None or s.line != line or s.direction != direction
+
+    def update(self, vid, station, headsign, line, direction, train_number, timetable_file):
+        # 状態を更新し、起きた変化（event）のリストを返す
+        new_trip = self.is_new_trip(vid, line, direction)
+        prev = self.states.get(vid)
+        self.states[vid] = VehicleState(station, headsign, line, direction,
+                                        train_number, timetable_file)
+        if new_trip:
+            return [NEW_TRIP]
+        events = []
+        if prev.station != station:
+            events.append(STATION_CHANGE)
+        if prev.headsign != headsign:
+            events.append(HEADSIGN_CHANGE)
+        if prev.train_number != train_number:
+            events.append(NUMBER_REASSIGNMENT)
+        return events
+
+    def get(self, vid):
+        return self.states.get(vid)
+
+    def snapshot(self):
+        # チェックポイント用。vehicle_id → 状態のタプル
+        return {vid: tuple(getattr(s, f) for f in VehicleState.__slots__)
+                for vid, s in self.states.items()}
+
+    def restore(self, snapshot):
+        self.states = {vid: VehicleState(*fields) for vid, fields in snapshot.items()}